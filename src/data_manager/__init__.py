@@ -1,21 +1,40 @@
-from data_manager.data_manager import (
-    ExperimentDataManager,
-    read_data_path,
-)  # noqa
-from data_manager.json_extender import ExtendedJSONDecoder, ExtendedJSONEncoder  # noqa
-from data_manager.browser_builder import (
-    rebuild_browser,
-    refresh_browser,
-    check_img_folder,
-)
+import importlib
+
+# everything is loaded on first access, so that a script that only saves json
+# doesn't have to import matplotlib or the browser (fitz, lxml)
+LAZY_ATTRIBUTES = {
+    "ExperimentDataManager": "data_manager.data_manager",
+    "read_data_path": "data_manager.utils",
+    "ExtendedJSONDecoder": "data_manager.json_extender",
+    "ExtendedJSONEncoder": "data_manager.json_extender",
+    "register_type": "data_manager.json_extender",
+    "materialize": "data_manager.json_extender",
+    "rebuild_browser": "data_manager.browser_builder",
+    "refresh_browser": "data_manager.browser_builder",
+    "check_img_folder": "data_manager.browser_builder",
+}
 
 
 __all__ = [
     "ExperimentDataManager",
     "ExtendedJSONDecoder",
     "ExtendedJSONEncoder",
+    "register_type",
+    "materialize",
     "read_data_path",
     "rebuild_browser",
     "refresh_browser",
     "check_img_folder",
 ]
+
+
+def __getattr__(name: str):
+    if name in LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(__all__))
@@ -0,0 +1,192 @@
+import io
+import json
+import os
+
+import numpy as np
+
+from data_manager.atomic import atomic_path
+
+# arrays that grow along their first axis, e.g. a state vector per iteration.
+# the rows go in raw binary chunk files of chunk_rows rows each, and
+# index.json keeps the dtype, the shape of a row and chunk_rows. appending
+# only writes to the end of the last chunk, and how many rows there are comes
+# from the size of the chunks, so a reader never sees half a row
+
+INDEX_FILENAME = "index.json"
+CHUNK_EXTENSION = ".bin"
+# a chunk is about this big
+CHUNK_BYTES = 2**26
+
+
+def chunk_fpath(dirname: os.PathLike, chunk: int) -> str:
+    return os.path.join(dirname, f"chunk_{chunk:05}{CHUNK_EXTENSION}")
+
+
+def read_index(dirname: os.PathLike) -> dict:
+    with io.open(os.path.join(dirname, INDEX_FILENAME), "r", encoding="utf8") as f:
+        return json.load(f)
+
+
+def write_index(dirname: os.PathLike, index: dict):
+    fpath = os.path.join(dirname, INDEX_FILENAME)
+    with atomic_path(fpath) as tmp_fpath:
+        with io.open(tmp_fpath, "w", encoding="utf8") as fstream:
+            json.dump(index, fstream, indent=4)
+
+
+def count_chunk_rows(dirname: os.PathLike, row_nbytes: int, chunk_rows: int) -> list:
+    # rows in each chunk, all full except maybe the last. a chunk that
+    # isn't full is the last one, even if the next one was started since
+    n_rows = []
+    chunk = 0
+    while os.path.isfile(chunk_fpath(dirname, chunk)):
+        size = os.path.getsize(chunk_fpath(dirname, chunk))
+        n_rows.append(min(size // row_nbytes, chunk_rows))
+        if n_rows[-1] < chunk_rows:
+            break
+        chunk += 1
+    return n_rows
+
+
+class ChunkedArrayWriter:
+    def __init__(self, dirname: os.PathLike, chunk_bytes: int = CHUNK_BYTES):
+        self.dirname = dirname
+        self.chunk_bytes = chunk_bytes
+        self.dtype = None
+        self.row_shape = None
+        self.chunk_rows = None
+        self.n_rows = 0
+        if os.path.isfile(os.path.join(dirname, INDEX_FILENAME)):
+            index = read_index(dirname)
+            self.dtype = np.dtype(index["dtype"])
+            self.row_shape = tuple(index["row_shape"])
+            self.chunk_rows = index["chunk_rows"]
+            n_rows = count_chunk_rows(dirname, self.row_nbytes, self.chunk_rows)
+            self.n_rows = sum(n_rows)
+            if n_rows:
+                # drop a half written row at the end
+                with io.open(chunk_fpath(dirname, len(n_rows) - 1), "ab") as fstream:
+                    fstream.truncate(n_rows[-1] * self.row_nbytes)
+
+    @property
+    def row_nbytes(self) -> int:
+        return self.dtype.itemsize * int(np.prod(self.row_shape))
+
+    def start(self, arr: np.ndarray):
+        # the first array sets the dtype and the shape of the rows
+        os.makedirs(self.dirname, exist_ok=True)
+        self.dtype = arr.dtype
+        self.row_shape = arr.shape[1:]
+        self.chunk_rows = max(1, self.chunk_bytes // max(1, self.row_nbytes))
+        write_index(
+            self.dirname,
+            {
+                "dtype": self.dtype.str,
+                "row_shape": list(self.row_shape),
+                "chunk_rows": self.chunk_rows,
+            },
+        )
+
+    def append(self, arr: np.ndarray):
+        # arr has shape (n, *row_shape), arr[None] for a single row
+        arr = np.asarray(arr)
+        if self.dtype is None:
+            if arr.ndim == 0:
+                raise ValueError("expected an array with at least one dimension")
+            self.start(arr)
+        if arr.ndim == 0 or arr.shape[1:] != self.row_shape:
+            raise ValueError(
+                f"expected rows of shape {self.row_shape}, got an array of shape {arr.shape}"
+            )
+        if not np.can_cast(arr.dtype, self.dtype, "same_kind"):
+            raise TypeError(f"can't append {arr.dtype} to an array of {self.dtype}")
+        arr = np.ascontiguousarray(arr, dtype=self.dtype)
+        start = 0
+        while start < len(arr):
+            chunk, row = divmod(self.n_rows, self.chunk_rows)
+            stop = start + min(self.chunk_rows - row, len(arr) - start)
+            with io.open(chunk_fpath(self.dirname, chunk), "ab") as fstream:
+                fstream.write(arr[start:stop].tobytes())
+            self.n_rows += stop - start
+            start = stop
+
+
+class ChunkedArray:
+    # looks like an array of shape (n_rows, *row_shape), indexing only maps
+    # the chunks that hold the selected rows
+    def __init__(self, dirname: os.PathLike):
+        self.dirname = dirname
+        index = read_index(dirname)
+        self.dtype = np.dtype(index["dtype"])
+        self.row_shape = tuple(index["row_shape"])
+        self.chunk_rows = index["chunk_rows"]
+        row_nbytes = self.dtype.itemsize * int(np.prod(self.row_shape))
+        self.n_chunk_rows = count_chunk_rows(dirname, row_nbytes, self.chunk_rows)
+        self.mmaps = {}
+
+    @property
+    def shape(self) -> tuple:
+        return (len(self),) + self.row_shape
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def __len__(self) -> int:
+        return sum(self.n_chunk_rows)
+
+    def __repr__(self) -> str:
+        return f"ChunkedArray(shape={self.shape}, dtype={self.dtype}, chunks={len(self.n_chunk_rows)})"
+
+    def chunk(self, chunk: int) -> np.memmap:
+        if chunk not in self.mmaps:
+            self.mmaps[chunk] = np.memmap(
+                chunk_fpath(self.dirname, chunk),
+                dtype=self.dtype,
+                mode="r",
+                shape=(self.n_chunk_rows[chunk],) + self.row_shape,
+            )
+        return self.mmaps[chunk]
+
+    def chunks(self):
+        for chunk in range(len(self.n_chunk_rows)):
+            yield self.chunk(chunk)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        row_key, rest = key[0], key[1:]
+        if isinstance(row_key, (int, np.integer)):
+            row = range(len(self))[row_key]
+            chunk, row = divmod(row, self.chunk_rows)
+            return self.chunk(chunk)[(row,) + rest]
+        if isinstance(row_key, slice) and row_key.step in (None, 1):
+            rows = range(len(self))[row_key]
+            if len(rows) == 0:
+                return np.empty((0,) + self.row_shape, dtype=self.dtype)[
+                    (slice(None),) + rest
+                ]
+            first, last = rows[0] // self.chunk_rows, rows[-1] // self.chunk_rows
+            parts = []
+            for chunk in range(first, last + 1):
+                offset = chunk * self.chunk_rows
+                start = max(rows.start - offset, 0)
+                stop = min(rows.stop - offset, self.n_chunk_rows[chunk])
+                parts.append(self.chunk(chunk)[(slice(start, stop),) + rest])
+            if len(parts) == 1:
+                return parts[0]
+            return np.concatenate(parts)
+        # steps, lists of rows and masks
+        rows = np.arange(len(self))[row_key]
+        chunks = rows // self.chunk_rows
+        out = np.empty((len(rows),) + self.row_shape, dtype=self.dtype)
+        for chunk in np.unique(chunks):
+            mask = chunks == chunk
+            out[mask] = self.chunk(chunk)[rows[mask] - chunk * self.chunk_rows]
+        return out[(slice(None),) + rest]
+
+    def __array__(self, dtype=None, copy=None):
+        arr = self[:]
+        if dtype is not None:
+            arr = arr.astype(dtype)
+        return np.asarray(arr)
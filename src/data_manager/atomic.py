@@ -0,0 +1,19 @@
+import contextlib
+import os
+import uuid
+
+# files are written next to where they go and moved there once complete,
+# so that readers (and whoever has the old one mmapped) never see half a file,
+# and a write that fails leaves the previous file, or nothing, behind
+
+
+@contextlib.contextmanager
+def atomic_path(fpath: os.PathLike):
+    # yields the path to write to instead of fpath
+    tmp_fpath = f"{fpath}.{uuid.uuid4().hex}.tmp"
+    try:
+        yield tmp_fpath
+        os.replace(tmp_fpath, fpath)
+    finally:
+        if os.path.exists(tmp_fpath):
+            os.remove(tmp_fpath)
@@ -1,5 +1,4 @@
 import io
-import json
 import os
 import re
 import uuid
@@ -7,15 +6,10 @@ from datetime import datetime
 
 import data_manager.constants as constants
 
-# will change this to PyMuPDF, though they are keeping the legacy import alive
-import fitz
-from data_manager.json_extender import (
-    ExtendedJSONDecoder,
-    ExtendedJSONEncoder,
-)
-
 # bs4 is for reading documents, not creating them.
 from lxml.html import HtmlElement, builder, fromstring, tostring
+from data_manager.metrics import latest_metrics
+from data_manager.result_cache import prune_cache_index
 from data_manager.utils import (
     read_data_path,
     read_browser_path,
@@ -23,6 +17,8 @@ from data_manager.utils import (
     delete_experiments_without_data,
     get_all_experiment_paths,
     setup_browser_folder,
+    list_data_files,
+    load_json_file,
 )
 
 HOME = os.path.dirname(__file__)
@@ -50,14 +46,7 @@ def get_var_dump(logging_dir: str):
     if len(var_dumps) >= 1:
         jobj = []
         for var_dump in var_dumps:
-            jobj.append(
-                json.loads(
-                    io.open(
-                        os.path.join(logging_dir, var_dump), "r", encoding="utf8"
-                    ).read(),
-                    cls=ExtendedJSONDecoder,
-                )
-            )
+            jobj.append(load_json_file(os.path.join(logging_dir, var_dump)))
         return jobj
     return []
 
@@ -96,12 +85,7 @@ def get_manifest(logging_dir: str):
     files = os.listdir(logging_dir)
     manifest = [x for x in files if x.startswith(constants.MANIFEST_FILENAME)]
     if len(manifest):
-        jobj = json.loads(
-            io.open(
-                os.path.join(logging_dir, manifest[0]), "r", encoding="utf8"
-            ).read(),
-            cls=ExtendedJSONDecoder,
-        )
+        jobj = load_json_file(os.path.join(logging_dir, manifest[0]))
         return jobj
     return {}
 
@@ -134,13 +118,10 @@ def pretty_manifest(manifest: dict, which: str = "list"):
 
 
 def get_data(data_dir: str):
-    files = os.listdir(data_dir)
+    files = list_data_files(data_dir)
     fpath = os.path.join(data_dir, files[0])
     print(f"loading {fpath}")
-    jobj = json.loads(
-        io.open(fpath, "r", encoding="utf8").read(),
-        cls=ExtendedJSONDecoder,
-    )
+    jobj = load_json_file(fpath)
     return jobj
 
 
@@ -159,6 +140,10 @@ def convert_pdf(pdf_path):
         os.path.join(read_browser_path(), IMG_DIR), f"{img_uuid}.jpeg"
     )
     if not os.path.isfile(img_fpath):
+        # will change this to PyMuPDF, though they are keeping the legacy import alive
+        # slow to import, only needed for the thumbnails
+        import fitz
+
         doc = fitz.open(pdf_path)
         page = doc.load_page(0)
         pixmap = page.get_pixmap(dpi=300)
@@ -350,6 +335,7 @@ def populate_run(experiment_path, run):
     logging_dir = os.path.join(run_path, "logging")
     fig_dir = os.path.join(run_path, "figures")
     data_dir = os.path.join(run_path, "data")
+    metrics_dir = os.path.join(run_path, constants.METRICS_DIR)
     if os.path.isdir(fig_dir):
         fig_div = builder.DIV(builder.H3("Figures"))
         fig_div.append(build_n_figs_div(fig_dir, n_img=100))
@@ -372,11 +358,17 @@ def populate_run(experiment_path, run):
             title.text = title.text + " "
             title.append(get_badge("Empty", "warning"))
         run_div.append(logging_div)
+    if os.path.isdir(metrics_dir):
+        latest = latest_metrics(metrics_dir)
+        if latest:
+            metrics_div = builder.DIV(builder.H3("Metrics"), **{"class": "container"})
+            metrics_div.append(dict_to_table(latest, "Latest values"))
+            run_div.append(metrics_div)
     if os.path.isdir(data_dir):
         title = builder.H3("Data")
         data_div = builder.DIV(title, **{"class": "container"})
         data_list = builder.UL(**{"class": "list-group"})
-        data_files = os.listdir(data_dir)
+        data_files = list_data_files(data_dir)
         for data_file in data_files:
             data_li = builder.LI(**{"class": "list-group-item"})
             data_li.append(
@@ -403,14 +395,7 @@ def get_folder_link(href: str):
 
 
 def load_json(fpath: str):
-    return json.loads(
-        io.open(
-            fpath,
-            "r",
-            encoding="utf8",
-        ).read(),
-        cls=ExtendedJSONDecoder,
-    )
+    return load_json_file(fpath)
 
 
 def get_browser_data(experiment_path):
@@ -722,5 +707,8 @@ def add_missing_experiments_to_browser():
 
 def refresh_browser():
     delete_experiments_without_data(read_data_path())
+    n_pruned = prune_cache_index(read_data_path())
+    if n_pruned:
+        print(f"Removed {n_pruned} cached results of deleted runs")
     remove_deleted_experiments_from_browser()
     add_missing_experiments_to_browser()
@@ -0,0 +1,71 @@
+import io
+import os
+import pickle
+import shutil
+import uuid
+from typing import Any
+
+import numpy as np
+
+# a checkpoint is a folder with the pickle of the object, where the big
+# buffers (numpy arrays mostly) are left out with protocol 5 and written
+# as raw files next to it. loading maps them back copy on write, so nothing
+# is read before it is used and the arrays can still be modified
+
+PICKLE_FILENAME = "object.pickle"
+BUFFER_EXTENSION = ".bin"
+# smaller buffers stay in the pickle
+OUT_OF_BAND_BYTES = 2**16
+
+
+def buffer_fpath(dirname: os.PathLike, ind: int) -> str:
+    return os.path.join(dirname, f"buffer_{ind:05}{BUFFER_EXTENSION}")
+
+
+def write_checkpoint(
+    obj: Any, dirname: os.PathLike, out_of_band_bytes: int = OUT_OF_BAND_BYTES
+):
+    # written next to the old one and swapped in, so that a crash while
+    # writing leaves the previous checkpoint there
+    parent, name = os.path.split(os.path.normpath(dirname))
+    tmp_dirname = os.path.join(parent, f"__{name}_{uuid.uuid4().hex}")
+    os.makedirs(tmp_dirname)
+    n_buffers = 0
+
+    def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+        nonlocal n_buffers
+        data = buffer.raw()
+        if data.nbytes < out_of_band_bytes:
+            return True
+        with io.open(buffer_fpath(tmp_dirname, n_buffers), "wb") as fstream:
+            fstream.write(data)
+        n_buffers += 1
+        return False
+
+    try:
+        with io.open(os.path.join(tmp_dirname, PICKLE_FILENAME), "wb") as fstream:
+            pickle.dump(obj, fstream, protocol=5, buffer_callback=buffer_callback)
+        if os.path.isdir(dirname):
+            old_dirname = os.path.join(parent, f"__{name}_{uuid.uuid4().hex}")
+            os.rename(dirname, old_dirname)
+            os.rename(tmp_dirname, dirname)
+            shutil.rmtree(old_dirname)
+        else:
+            os.rename(tmp_dirname, dirname)
+    except BaseException:
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+        raise
+
+
+def map_buffer(fpath: os.PathLike):
+    if os.path.getsize(fpath) == 0:
+        return bytearray()
+    return np.memmap(fpath, dtype=np.uint8, mode="c")
+
+
+def read_checkpoint(dirname: os.PathLike) -> Any:
+    buffers = []
+    while os.path.isfile(buffer_fpath(dirname, len(buffers))):
+        buffers.append(map_buffer(buffer_fpath(dirname, len(buffers))))
+    with io.open(os.path.join(dirname, PICKLE_FILENAME), "rb") as fstream:
+        return pickle.load(fstream, buffers=buffers)
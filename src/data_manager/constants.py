@@ -12,3 +12,7 @@ BROWSER_FOLDER = "__browser_data"
 OTHER_PROJECT = "no specific"
 TIMESTAMP_KEY = "__timestamp"
 VAR_DUMP = "var_dump"
+SIDECAR_DIR = "__arrays"
+METRICS_DIR = "metrics"
+CHUNKED_DIR = "__chunked"
+CHECKPOINT_DIR = "checkpoints"
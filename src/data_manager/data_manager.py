@@ -1,34 +1,69 @@
 import atexit
+import copy
 import io
-import json
-import logging
 import os
 import pickle
 import re
 import sys
 import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Literal
+from functools import partial
+from typing import Callable, Literal, TYPE_CHECKING, Union
 import inspect
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 import __main__
 import data_manager.constants as constants
-from data_manager.browser_builder import add_to_browser
-from data_manager.json_extender import ExtendedJSONDecoder
+from data_manager.array_store import ChunkedArray, ChunkedArrayWriter
+from data_manager.atomic import atomic_path
+from data_manager.checkpoints import read_checkpoint, write_checkpoint
+from data_manager.figure_cache import (
+    figure_fingerprint,
+    link_figure,
+    read_fingerprints,
+    write_fingerprints,
+)
+from data_manager.json_scanner import load_json_keys
+from data_manager.memo import MEMO_MAX_BYTES, MemoizedFunction
+from data_manager.result_cache import add_to_index, canonical_hash, find_in_index
+from data_manager.sweeps import (
+    RESULT_FILENAME,
+    SWEEP_KEY,
+    chunk_points,
+    expand_grid,
+    run_points,
+    sweep_key,
+)
+from data_manager.metrics import MetricsLogger, load_metrics
 from data_manager.utils import (
+    COMPRESSION_EXTENSIONS,
     dirname_has_substring,
-    extended_dumps,
+    extended_dump,
+    get_figure_arrays,
     get_figure_dict,
     get_project_list,
+    init_figure_worker,
+    list_data_files,
+    load_json_file,
+    load_json_files,
+    FilenameIndex,
     name_builder,
+    open_json_file,
+    resolve_json_fpath,
     normalize_str,
     read_data_path,
+    render_figure,
     timestamp_dict,
 )
+from data_manager.writers import BackgroundWriter, PrintRedirect
+
+# matplotlib and the browser (fitz, lxml) are slow to import,
+# they only get imported when needed
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
 
 
 class ExperimentDataManager:
@@ -40,6 +75,9 @@ class ExperimentDataManager:
         file_default_name: str = None,
         overwrite_experiment: bool = False,
         redirect_print_output: bool = False,
+        print_log_max_bytes: int = None,
+        print_log_backups: int = 10,
+        print_log_compression: Literal["gzip", "bz2", "lzma"] = None,
         notes: str = None,
         zero_padding_len: int = 5,
         experiment_date: str = None,
@@ -52,6 +90,17 @@ class ExperimentDataManager:
         tags: str = None,
         project: str = None,
         start_new_run: bool = True,
+        array_sidecar_threshold: int = None,
+        ndarray_format: Literal["list", "base64"] = "list",
+        compression: Literal["gzip", "bz2", "lzma"] = None,
+        compression_level: int = None,
+        async_writes: bool = False,
+        max_pending_writes: int = 8,
+        async_figures: bool = False,
+        figure_workers: int = None,
+        dedupe_figures: bool = False,
+        defer_logging: bool = False,
+        shared_experiment: bool = False,
     ) -> None:
         # get everything to save for later
         self.registered_projects = get_project_list()
@@ -65,6 +114,18 @@ class ExperimentDataManager:
         else:
             self.project = constants.OTHER_PROJECT
         self.redirect_print_output = redirect_print_output
+        # print_output.log is rotated when bigger than print_log_max_bytes
+        self.print_log_max_bytes = print_log_max_bytes
+        self.print_log_backups = print_log_backups
+        if (
+            print_log_compression is not None
+            and print_log_compression not in COMPRESSION_EXTENSIONS
+        ):
+            raise ValueError(
+                f"expected print_log_compression to be one of {list(COMPRESSION_EXTENSIONS.keys())}, got: {print_log_compression}"
+            )
+        self.print_log_compression = print_log_compression
+        self.print_redirect = None
         self.notes = notes
         if data_folder is None:
             self.data_folder = read_data_path()
@@ -72,6 +133,52 @@ class ExperimentDataManager:
             self.data_folder = data_folder
         self.zero_padding_len = zero_padding_len
         self.dry_run = dry_run
+        # names already used in each folder, to find free names quickly
+        self.filename_index = FilenameIndex()
+        # arrays bigger than this (in bytes) are saved as .npy next to the json
+        self.array_sidecar_threshold = array_sidecar_threshold
+        # base64 is much smaller and faster for numeric arrays, list is readable
+        self.ndarray_format = ndarray_format
+        # saved json files get compressed, loading figures it out by itself
+        if compression is not None and compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(
+                f"expected compression to be one of {list(COMPRESSION_EXTENSIONS.keys())}, got: {compression}"
+            )
+        self.compression = compression
+        self.compression_level = compression_level
+        # save_dict hands a copy of the object to a writer thread and returns.
+        # flush() waits for the writes, and raises the errors if any
+        self.async_writes = async_writes
+        self.writer = None
+        if self.async_writes:
+            self.writer = BackgroundWriter(max_pending=max_pending_writes)
+        # save_figure pickles the figure and a process pool renders the pdf,
+        # flush() waits for them
+        self.async_figures = async_figures
+        self.figure_workers = figure_workers
+        self.figure_pool = None
+        self.figure_futures = []
+        # save_figure doesn't render a figure identical to one already in the
+        # run, it links to it. figures folder -> {fingerprint: saved figure}
+        self.dedupe_figures = dedupe_figures
+        self.figure_fingerprints = {}
+        # only make the folders when starting, the manifest, source, restore
+        # file and browser manifest get written on the first save, on flush
+        # or at exit
+        self.defer_logging = defer_logging
+        self.deferred_logging = []
+        # many processes with the same experiment_name add their runs to
+        # one experiment instead of each making their own
+        self.shared_experiment = shared_experiment
+        if shared_experiment and experiment_name is None:
+            raise ValueError("shared_experiment needs an experiment_name")
+        # appends the scalars of log_metrics to the current run
+        self.metrics_logger = None
+        # run_number -> hash of the params given to cached_result, the files
+        # saved in that run get indexed under it
+        self.cache_keys = {}
+        # dirname -> writer, for append_array
+        self.array_writers = {}
 
         # default filename
         if file_default_name is None:
@@ -106,7 +213,7 @@ class ExperimentDataManager:
         # if we allow the experiment to continue over the original folder
         # why the dry run? can't remember
         experiment_name = normalize_str(experiment_name)
-        if overwrite_experiment or self.dry_run:
+        if overwrite_experiment or self.shared_experiment or self.dry_run:
             self.experiment_name = experiment_name
         else:
             self.experiment_name = self.ensure_experiment_name(experiment_name)
@@ -134,6 +241,93 @@ class ExperimentDataManager:
         if not dry_run and self.add_to_browser:
             atexit.register(self.add_myself)
 
+        # registered last so that it runs before add_myself
+        if not dry_run:
+            atexit.register(self.flush)
+
+    def flush(self):
+        # wait for everything that is still being written
+        self.write_deferred_logging()
+        if self.metrics_logger is not None:
+            self.metrics_logger.flush()
+        if self.print_redirect is not None:
+            self.print_redirect.flush()
+        if self.writer is not None:
+            self.writer.flush()
+        self.wait_for_figures()
+
+    def wait_for_figures(self):
+        futures, self.figure_futures = self.figure_futures, []
+        errors = []
+        for future in futures:
+            try:
+                print("saved figure to {}".format(future.result()))
+            except Exception as e:
+                errors.append(e)
+        if len(errors) == 1:
+            raise errors[0]
+        elif errors:
+            raise RuntimeError(
+                f"{len(errors)} figures failed to render, first one: {errors[0]!r}"
+            ) from errors[0]
+
+    def render_figure_async(self, fig: "plt.Figure", figure_fpath: str, **kwargs):
+        # the figure is pickled now so that it can be changed or closed
+        # right after. figures that can't be pickled are saved here instead
+        try:
+            fig_pickle = pickle.dumps(fig, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"can't pickle the figure ({e!r}), saving it now")
+            fig.savefig(figure_fpath, **kwargs)
+            print("saved figure to {}".format(figure_fpath))
+            return
+        if self.figure_pool is None:
+            self.figure_pool = ProcessPoolExecutor(
+                max_workers=self.figure_workers, initializer=init_figure_worker
+            )
+        self.figure_futures.append(
+            self.figure_pool.submit(render_figure, fig_pickle, figure_fpath, **kwargs)
+        )
+
+    def get_figure_fingerprints(self, dirname: os.PathLike) -> dict:
+        # read once per folder, kept up to date by save_figure
+        if dirname not in self.figure_fingerprints:
+            self.figure_fingerprints[dirname] = read_fingerprints(dirname)
+        return self.figure_fingerprints[dirname]
+
+    def find_saved_figure(self, fingerprint: str) -> dict:
+        # {"filename", "name"} of the figure with this fingerprint in the
+        # current run, if any
+        fingerprints = self.get_figure_fingerprints(self.current_fig_dir)
+        if fingerprint not in fingerprints:
+            return None
+        figure_fpath = os.path.join(
+            self.current_fig_dir, fingerprints[fingerprint]["filename"]
+        )
+        if not os.path.isfile(figure_fpath) and self.figure_futures:
+            # might still be rendering
+            self.wait_for_figures()
+        if not os.path.isfile(figure_fpath):
+            # deleted since
+            del fingerprints[fingerprint]
+            return None
+        return fingerprints[fingerprint]
+
+    def add_figure_fingerprint(self, fingerprint: str, figure_fpath: str, name: str):
+        dirname = os.path.dirname(figure_fpath)
+        fingerprints = self.get_figure_fingerprints(dirname)
+        fingerprints[fingerprint] = {
+            "filename": os.path.basename(figure_fpath),
+            "name": name,
+        }
+        write_fingerprints(dirname, fingerprints)
+
+    def write_deferred_logging(self):
+        # the list is emptied first since these call save_dict themselves
+        deferred_logging, self.deferred_logging = self.deferred_logging, []
+        for func in deferred_logging:
+            func()
+
     @classmethod
     def format_for_display(cls, s: str):
         s2 = re.sub(r"_[0-9]{2}h[0-9]{2}", "", s)
@@ -141,9 +335,19 @@ class ExperimentDataManager:
         return s2
 
     def create_browser_data(self, tags: str = None):
+        if self.defer_logging:
+            self.deferred_logging.append(partial(self.write_browser_data, tags))
+        else:
+            self.write_browser_data(tags)
+
+    def write_browser_data(self, tags: str = None):
         browser_data_dir = os.path.join(self.experiment_path, constants.BROWSER_FOLDER)
-        if not os.path.isdir(browser_data_dir):
+        try:
             os.makedirs(browser_data_dir)
+        except FileExistsError:
+            # the first process of a shared experiment writes it
+            if self.shared_experiment:
+                return
 
         jobj = {
             "display_name": self.format_for_display(self.experiment_name),
@@ -161,6 +365,8 @@ class ExperimentDataManager:
             category=constants.LOGGING_DIR,
             dirname=browser_data_dir,
             add_timestamp=False,
+            # the browser and load() expect plain json here
+            compress=False,
         )
 
     @property
@@ -170,6 +376,8 @@ class ExperimentDataManager:
         )
 
     def add_myself(self):
+        from data_manager.browser_builder import add_to_browser
+
         try:
             if hasattr(sys, "last_value"):
                 last_exception = sys.last_value
@@ -205,11 +413,12 @@ class ExperimentDataManager:
         else:
             return run_number
 
-    def save_source(self):
-        source = inspect.getsource(__main__)
+    def save_source(self, source: str = None, run_number: int = -1):
+        if source is None:
+            source = inspect.getsource(__main__)
         if not self.dry_run:
             fpath = self.get_savepath(
-                dirname=None,
+                dirname=self.saving_dirname(run_number),
                 filename=Path(__main__.__file__).stem,
                 extension=".py",
                 subfolder=constants.LOGGING_DIR,
@@ -223,16 +432,35 @@ class ExperimentDataManager:
 
     def setup_logging(self, notes: str):
         if self.save_logging_files and not self.dry_run:
-            self.save_manifest(notes=notes)
-            self.save_source()
-            self.save_experiment_manager()
+            if self.defer_logging:
+                # the run folder is already there, the source is read now in
+                # case the script gets edited before the files are written
+                self.deferred_logging.extend(
+                    (
+                        partial(
+                            self.save_manifest, notes=notes, run_number=self.run_number
+                        ),
+                        partial(
+                            self.save_source,
+                            source=inspect.getsource(__main__),
+                            run_number=self.run_number,
+                        ),
+                        partial(
+                            self.save_experiment_manager, run_number=self.run_number
+                        ),
+                    )
+                )
+            else:
+                self.save_manifest(notes=notes)
+                self.save_source()
+                self.save_experiment_manager()
             if self.redirect_print_output:
                 self.redirect_print()
 
     def create_date_folder(self):
         dirname = os.path.join(self.data_folder, self.experiment_date)
         if not self.dry_run and not os.path.exists(dirname):
-            os.makedirs(dirname)
+            os.makedirs(dirname, exist_ok=True)
             print("created {}".format(dirname))
 
     def redirect_print(self):
@@ -243,25 +471,23 @@ class ExperimentDataManager:
                 subfolder=constants.LOGGING_DIR,
                 add_timestamp=False,
             )
-            targets = (
-                logging.StreamHandler(sys.stdout),
-                logging.FileHandler(print_output_fpath),
-            )
-            logging.basicConfig(
-                format="%(message)s", level=logging.INFO, handlers=targets
+            # a new run gets its own log
+            if self.print_redirect is not None:
+                self.print_redirect.stop()
+            self.print_redirect = PrintRedirect(
+                print_output_fpath,
+                max_bytes=self.print_log_max_bytes,
+                backup_count=self.print_log_backups,
+                compression=self.print_log_compression,
             )
-
-            def custom_print(*args, **kwargs):
-                logging.info(*args)
-
-            __main__.print = custom_print
+            __main__.print = self.print_redirect.print
             print(
                 "Redirect print of {} to {}".format(
                     __main__.__file__, print_output_fpath
                 )
             )
 
-    def save_manifest(self, notes: str):
+    def save_manifest(self, notes: str, run_number: int = -1):
         manifest = {"main_file": __main__.__file__}
         # add notes to manifest
         if notes is not None:
@@ -270,7 +496,9 @@ class ExperimentDataManager:
             jobj=manifest,
             filename=constants.MANIFEST_FILENAME,
             category=constants.LOGGING_DIR,
+            dirname=self.saving_dirname(run_number),
             add_timestamp=False,
+            compress=False,
         )
         print("Saved manifest: {}".format(manifest))
 
@@ -282,10 +510,28 @@ class ExperimentDataManager:
         else:
             self.run_number += 1
         if not self.dry_run:
+            self.claim_run()
             print("Starting run {}".format(self.run_number))
             self.setup_logging(notes=notes)
             print("Run saving in folder: {}".format(self.current_run_dir))
 
+    def claim_run(self):
+        # makes the run folder, and takes the next number if someone else
+        # made it first. no locks, mkdir fails if the folder exists
+        experiment_path = os.path.dirname(self.saving_dirname(0))
+        os.makedirs(experiment_path, exist_ok=True)
+        if self.shared_experiment:
+            # skip what the other processes already took
+            self.run_number = max(
+                [self.run_number] + [n + 1 for n in self.existing_run_numbers()]
+            )
+        while True:
+            try:
+                os.mkdir(self.current_saving_dirname)
+                return
+            except FileExistsError:
+                self.run_number += 1
+
     def data_dir(self, run_number: int = -1):
         run_number = self.check_run_number(run_number)
         return os.path.join(self.saving_dirname(run_number), constants.DATA_DIR)
@@ -327,7 +573,7 @@ class ExperimentDataManager:
 
     def saved_dicts(self, run_number: int = -1) -> list:
         run_number = self.check_run_number(run_number)
-        return os.listdir(
+        return list_data_files(
             os.path.join(self.saving_dirname(run_number), constants.DATA_DIR)
         )
 
@@ -353,10 +599,119 @@ class ExperimentDataManager:
         # this is where you save current stuff
         return self.saving_dirname(self.run_number)
 
-    def load_saved_dict(self, dict_filename: str, run_number: int = -1) -> dict:
+    def metrics_dir(self, run_number: int = -1) -> str:
         run_number = self.check_run_number(run_number)
-        fpath = os.path.join(self.data_dir(run_number), dict_filename)
-        return json.load(io.open(fpath, mode="rb"), cls=ExtendedJSONDecoder)
+        return os.path.join(self.saving_dirname(run_number), constants.METRICS_DIR)
+
+    def log_metrics(self, step: int = None, **scalars):
+        # edm.log_metrics(step=i, loss=loss, energy=energy)
+        # step defaults to the number of rows logged so far in this run
+        if self.dry_run:
+            return
+        self.write_deferred_logging()
+        dirname = self.metrics_dir()
+        if self.metrics_logger is None or self.metrics_logger.dirname != dirname:
+            if self.metrics_logger is not None:
+                self.metrics_logger.flush()
+            self.metrics_logger = MetricsLogger(dirname)
+        self.metrics_logger.log(step=step, **scalars)
+
+    def load_metrics(self, run_number: int = -1) -> dict:
+        # {"step": array, "loss": array, ...}
+        self.flush()
+        return load_metrics(self.metrics_dir(run_number))
+
+    def chunked_array_dir(self, name: str, run_number: int = -1) -> str:
+        return os.path.join(self.data_dir(run_number), constants.CHUNKED_DIR, name)
+
+    def append_array(self, name: str, arr: np.ndarray):
+        # grows the array called name along its first axis, only the new
+        # rows get written. use arr[None] to append a single row
+        if self.dry_run:
+            return
+        self.write_deferred_logging()
+        dirname = self.chunked_array_dir(name)
+        if dirname not in self.array_writers:
+            self.array_writers[dirname] = ChunkedArrayWriter(dirname)
+        self.array_writers[dirname].append(arr)
+
+    def open_array(self, name: str, run_number: int = -1) -> ChunkedArray:
+        # memory mapped, indexing only reads the chunks it needs
+        self.flush()
+        return ChunkedArray(self.chunked_array_dir(name, run_number))
+
+    def checkpoint_dir(self, name: str, run_number: int = -1) -> str:
+        return os.path.join(
+            self.saving_dirname(run_number), constants.CHECKPOINT_DIR, name
+        )
+
+    def save_checkpoint(self, obj, name: str = "checkpoint"):
+        # replaces the previous checkpoint of the same name, numpy arrays
+        # are written as raw files and memory mapped back by load_checkpoint
+        if self.dry_run:
+            return
+        self.write_deferred_logging()
+        dirname = self.checkpoint_dir(name)
+        write_checkpoint(obj, dirname)
+        print("saved checkpoint to {}".format(dirname))
+
+    def load_checkpoint(self, name: str = "checkpoint", run_number: int = -1):
+        self.flush()
+        return read_checkpoint(self.checkpoint_dir(name, run_number))
+
+    def cached_result(self, params: dict, version: str = None) -> dict:
+        # looks for a run anywhere in the data folder that was given the same
+        # params and version, and returns {filename: data} of what it saved.
+        # if there's none, returns None and indexes what this run saves next
+        #   cached = edm.cached_result(params, version="v2")
+        #   if cached is None:
+        #       edm.save_dict(compute(**params), filename="result")
+        key = canonical_hash(params, version)
+        found = find_in_index(self.data_folder, key)
+        if found is None:
+            self.cache_keys[self.run_number] = key
+            return None
+        print("found cached result in {}".format(found["run_path"]))
+        return {
+            os.path.basename(fpath).split(".")[0]: load_json_file(fpath)
+            for fpath in found["fpaths"]
+        }
+
+    def memoize(
+        self,
+        func: Callable = None,
+        *,
+        version: str = None,
+        max_bytes: int = MEMO_MAX_BYTES,
+    ):
+        # @edm.memoize or @edm.memoize(version="v2", max_bytes=2**28)
+        # the results are kept in the data folder, for every script and process.
+        # they come back the way the json encoder saves them (tuples are lists)
+        # func.cache_info() and func.cache_clear() to look at them
+        if func is None:
+            return partial(self.memoize, version=version, max_bytes=max_bytes)
+        return MemoizedFunction(
+            func, self.data_folder, version=version, max_bytes=max_bytes
+        )
+
+    def load_saved_dict(
+        self,
+        dict_filename: str,
+        run_number: int = -1,
+        keys: list = None,
+        lazy: bool = False,
+    ) -> dict:
+        # keys=["energies", "params.n_qubits"] only decodes these values
+        # and skips the rest of the file
+        # lazy only builds arrays and other heavy objects when they are used
+        self.flush()
+        run_number = self.check_run_number(run_number)
+        fpath = resolve_json_fpath(
+            os.path.join(self.data_dir(run_number), dict_filename)
+        )
+        if keys is not None:
+            return load_json_keys(fpath, keys, lazy=lazy)
+        return load_json_file(fpath, lazy=lazy)
 
     @property
     def last_saved_data_file(self):
@@ -369,7 +724,7 @@ class ExperimentDataManager:
         )
         if not os.path.isdir(run_data_folder):
             return ""
-        filenames = os.listdir(run_data_folder)
+        filenames = list_data_files(run_data_folder)
         fpath = os.path.join(run_data_folder, max(filenames))
         return fpath
 
@@ -377,12 +732,12 @@ class ExperimentDataManager:
     def load_last_saved_data_file(self) -> dict:
         return self.load_run_last_saved_data_file()
 
-    def load_run_last_saved_data_file(self, run_number: int = -1) -> dict:
+    def load_run_last_saved_data_file(
+        self, run_number: int = -1, lazy: bool = False
+    ) -> dict:
+        self.flush()
         fpath = self.run_last_saved_data_file(run_number=run_number)
-        jobj = json.loads(
-            io.open(fpath, "r", encoding="utf8").read(),
-            cls=ExtendedJSONDecoder,
-        )
+        jobj = load_json_file(fpath, lazy=lazy)
         print(f"Loaded file: {fpath}")
         return jobj
 
@@ -394,79 +749,255 @@ class ExperimentDataManager:
     def clock(self):
         return datetime.today().strftime(constants.CLOCK_FORMAT)
 
-    def change_filename_if_double(self, filename: str, dirname: str):
+    def change_filename_if_double(
+        self, filename: str, dirname: str, extension: str = ""
+    ) -> str:
+        # returns the filename without extension, with _0000n appended if
+        # something with the same name already exists in dirname
         if "." in filename:
-            filename = filename.split(".")[0]
-            extension = filename.split(".")[1]
-            exisiting_files = [
-                f.split(".")[0]
-                for f in os.listdir(dirname)
-                if f.split(".")[1] == extension
-            ]
-        else:
-            extension = None
-            exisiting_files = [f.split(".")[0] for f in os.listdir(dirname)]
-
-        original_filename = filename
-        trial_filename = filename
-        n = 1
-        n_tries = 0
-        while trial_filename in exisiting_files:
-            trial_filename = original_filename + "_" + f"{n:0{self.zero_padding_len}}"
-            n += 1
-            n_tries += 1
-            # in case you know
-            if n_tries > 1000:
-                trial_filename = original_filename + name_builder(["animals.txt"])
-                return trial_filename
-        return trial_filename
+            filename, file_extension = filename.split(".", 1)
+            extension = "." + file_extension
+        return self.filename_index.reserve(
+            dirname=dirname,
+            stem=filename,
+            extension=extension,
+            zero_padding_len=self.zero_padding_len,
+        )
 
     def ensure_experiment_name(self, experiment_name):
         if self.use_calendar:
             dirname = os.path.join(self.data_folder, self.experiment_date)
         else:
             dirname = self.data_folder
-        experiment_name = self.change_filename_if_double(
-            filename=experiment_name, dirname=dirname
+            os.makedirs(dirname, exist_ok=True)
+        return self.filename_index.reserve_dir(
+            dirname=dirname,
+            stem=experiment_name,
+            zero_padding_len=self.zero_padding_len,
         )
-        return experiment_name
 
-    def save_experiment_manager(self):
+    def save_experiment_manager(self, run_number: int = -1):
         # save self data for later use
+        run_number = self.check_run_number(run_number)
         jobj = {
             "init": {
                 "experiment_name": self.experiment_name,
                 "file_default_name": self.file_default_name,
                 "redirect_print_output": self.redirect_print_output,
+                "print_log_max_bytes": self.print_log_max_bytes,
+                "print_log_backups": self.print_log_backups,
+                "print_log_compression": self.print_log_compression,
                 "zero_padding_len": self.zero_padding_len,
                 "experiment_date": self.experiment_date,
                 "use_runs": self.use_runs,
                 "use_calendar": self.use_calendar,
                 "project": self.project,
                 "notes": self.notes,
+                "array_sidecar_threshold": self.array_sidecar_threshold,
+                "ndarray_format": self.ndarray_format,
+                "compression": self.compression,
+                "compression_level": self.compression_level,
+                "defer_logging": self.defer_logging,
             },
-            "run_number": self.run_number,
-            "current_run_dir": self.current_run_dir,
+            "run_number": run_number,
+            "current_run_dir": self.run_dir(run_number),
         }
         self.save_dict(
             jobj=jobj,
             filename=constants.RESTORE_FILENAME,
             category=constants.LOGGING_DIR,
+            dirname=self.saving_dirname(run_number),
+            compress=False,
         )
 
-    def load_var_dump(self, run_number: int = -1):
+    def load_var_dump(self, run_number: int = -1, workers: int = 1):
+        self.flush()
         run_number = self.check_run_number(run_number)
         d = {}
         dirname = self.logging_dir(run_number)
         var_dumps = [f for f in os.listdir(dirname) if constants.VAR_DUMP in f]
-        for var_dump in var_dumps:
-            fpath = os.path.join(dirname, var_dump)
-            jobj = json.loads(
-                io.open(fpath, "r", encoding="utf8").read(), cls=ExtendedJSONDecoder
-            )
+        fpaths = [os.path.join(dirname, var_dump) for var_dump in var_dumps]
+        for jobj in load_json_files(fpaths, workers=workers):
             d.update(jobj)
         return d
 
+    def existing_run_numbers(self) -> list:
+        # runs on disk, which might be more than this manager started
+        experiment_dirname = os.path.dirname(self.saving_dirname(0))
+        run_numbers = []
+        for dirname in os.listdir(experiment_dirname):
+            if dirname.startswith(constants.RUN_DIR + "_"):
+                try:
+                    run_numbers.append(int(dirname[len(constants.RUN_DIR) + 1 :]))
+                except ValueError:
+                    pass
+        return sorted(run_numbers)
+
+    def load_many(
+        self,
+        filenames: list = None,
+        run_number: int = -1,
+        workers: int = None,
+        executor: Literal["process", "thread"] = "thread",
+        lazy: bool = False,
+    ) -> list:
+        # decodes the files in parallel, results are in the order of filenames
+        # (all the saved dicts of the run, sorted, if None)
+        self.flush()
+        run_number = self.check_run_number(run_number)
+        if filenames is None:
+            filenames = sorted(self.saved_dicts(run_number))
+        fpaths = [
+            resolve_json_fpath(os.path.join(self.data_dir(run_number), filename))
+            for filename in filenames
+        ]
+        return load_json_files(fpaths, workers=workers, executor=executor, lazy=lazy)
+
+    def load_many_runs(
+        self,
+        filenames: list = None,
+        run_numbers: list = None,
+        workers: int = None,
+        executor: Literal["process", "thread"] = "thread",
+        lazy: bool = False,
+    ) -> dict:
+        # {run_number: [dicts]}, all the files go in the same pool
+        self.flush()
+        if run_numbers is None:
+            run_numbers = self.existing_run_numbers()
+        fpaths = []
+        n_files = []
+        for run_number in run_numbers:
+            run_filenames = filenames
+            if run_filenames is None:
+                run_filenames = sorted(self.saved_dicts(run_number))
+            fpaths.extend(
+                resolve_json_fpath(os.path.join(self.data_dir(run_number), filename))
+                for filename in run_filenames
+            )
+            n_files.append(len(run_filenames))
+        jobjs = load_json_files(fpaths, workers=workers, executor=executor, lazy=lazy)
+        runs = {}
+        start = 0
+        for run_number, n in zip(run_numbers, n_files):
+            runs[run_number] = jobjs[start : start + n]
+            start += n
+        return runs
+
+    def done_sweep_points(self) -> dict:
+        # {sweep key: run_number} of the points that have their result saved
+        done = {}
+        for run_number in self.existing_run_numbers():
+            if not os.path.isdir(self.logging_dir(run_number)):
+                continue
+            result_fpath = resolve_json_fpath(
+                os.path.join(self.data_dir(run_number), RESULT_FILENAME + ".json")
+            )
+            if not os.path.isfile(result_fpath):
+                continue
+            key = self.load_var_dump(run_number).get(SWEEP_KEY)
+            if key is not None:
+                done[key] = run_number
+        return done
+
+    def load_sweep_result(self, run_number: int):
+        result = self.load_saved_dict(RESULT_FILENAME + ".json", run_number)
+        result.pop(constants.TIMESTAMP_KEY, None)
+        if list(result.keys()) == ["__content"]:
+            return result["__content"]
+        return result
+
+    def save_sweep_point(self, params: dict, key: str, result):
+        self.new_run()
+        self.save_dict(
+            {**params, SWEEP_KEY: key},
+            category=constants.LOGGING_DIR,
+            filename=constants.VAR_DUMP,
+            add_timestamp=False,
+        )
+        self.save_dict(result, filename=RESULT_FILENAME)
+
+    def sweep(
+        self,
+        func: Callable,
+        grid: Union[dict, list],
+        workers: int = None,
+        chunksize: int = 1,
+        resume: bool = True,
+        executor: Literal["process", "thread"] = "process",
+    ) -> list:
+        # func(**params) for every point of the grid, each point gets its own
+        # run with the params in the var_dump and what func returns saved.
+        # grid is {"a": [1, 2], "b": [3, 4]} for all combinations or a list
+        # of dicts. func has to be picklable (defined at the top of a module)
+        # for processes. chunksize points are sent to a worker at once, for
+        # very short funcs. with resume, the points that are already done in
+        # this experiment are loaded instead (after a crash, pick the same
+        # experiment back with overwrite_experiment=True).
+        # returns the results in the order of the grid
+        points = expand_grid(grid)
+        keys = [sweep_key(func, params) for params in points]
+        results = [None] * len(points)
+        done = self.done_sweep_points() if resume else {}
+        pending = []
+        for ind, key in enumerate(keys):
+            if key in done:
+                results[ind] = self.load_sweep_result(done[key])
+            else:
+                pending.append(ind)
+        n_done = len(points) - len(pending)
+        if n_done:
+            print(f"sweep: {n_done}/{len(points)} points already done")
+        chunks = chunk_points(pending, chunksize)
+        if workers is None:
+            workers = os.cpu_count()
+        workers = min(workers, len(chunks))
+        errors = []
+
+        def finish_chunk(chunk: list, chunk_results: list):
+            nonlocal n_done
+            for ind, result in zip(chunk, chunk_results):
+                self.save_sweep_point(points[ind], keys[ind], result)
+                results[ind] = result
+                n_done += 1
+            print(f"sweep: {n_done}/{len(points)} points done")
+
+        if workers <= 1:
+            for chunk in chunks:
+                try:
+                    chunk_results = run_points(func, [points[i] for i in chunk])
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                finish_chunk(chunk, chunk_results)
+        else:
+            if executor == "process":
+                pool_class = ProcessPoolExecutor
+            elif executor == "thread":
+                pool_class = ThreadPoolExecutor
+            else:
+                raise ValueError(
+                    f"expected executor to be process or thread, got: {executor}"
+                )
+            with pool_class(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(run_points, func, [points[i] for i in chunk]): chunk
+                    for chunk in chunks
+                }
+                # saved as they come so that a crash loses as little as possible
+                for future in as_completed(futures):
+                    try:
+                        chunk_results = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    finish_chunk(futures[future], chunk_results)
+        if errors:
+            raise RuntimeError(
+                f"{len(errors)} chunks of the sweep failed, run it again to resume. first error: {errors[0]!r}"
+            ) from errors[0]
+        return results
+
     @classmethod
     def load(cls, experiment_dirname: str, read_only: bool = True):
         # This allows you to pick up where you stopped,
@@ -480,13 +1011,8 @@ class ExperimentDataManager:
         current_log_dir = os.path.join(current_run_dir, last_log)
         restore_fn = dirname_has_substring(current_log_dir, constants.RESTORE_FILENAME)
 
-        # restore it
-        restore_file = io.open(
-            os.path.join(current_log_dir, restore_fn), "r", encoding="utf8"
-        ).read()
-
         # load jobj and restore without new run
-        jobj = json.loads(restore_file, cls=ExtendedJSONDecoder)
+        jobj = load_json_file(os.path.join(current_log_dir, restore_fn))
 
         # hacky stuff for legacy
         if "data_folder" in jobj["init"].keys():
@@ -509,6 +1035,9 @@ class ExperimentDataManager:
             edm.save_dict = None
             edm.save_figure = None
             edm.var_dump = None
+            edm.save_checkpoint = None
+            edm.log_metrics = None
+            edm.append_array = None
 
         edm.data_folder = Path(experiment_dirname).parent
         edm.use_calendar = False
@@ -538,21 +1067,15 @@ class ExperimentDataManager:
 
         # create required path
         if not self.dry_run and not os.path.exists(dirname):
-            os.makedirs(dirname)
+            os.makedirs(dirname, exist_ok=True)
             print("created {}".format(dirname))
 
         # if no filename, pick one from the list and append number
         if filename is None:
-            if os.path.exists(dirname):
-                files = os.listdir(dirname)
-                n_files = len(files)
-                filename = (
-                    self.file_default_name + "_" + f"{n_files:0{self.zero_padding_len}}"
-                )
-            else:
-                filename = (
-                    self.file_default_name + "_" + f"{0:0{self.zero_padding_len}}"
-                )
+            n_files = self.filename_index.count(dirname)
+            filename = (
+                self.file_default_name + "_" + f"{n_files:0{self.zero_padding_len}}"
+            )
 
         # remove duplicate extension if necessary
         else:
@@ -566,8 +1089,10 @@ class ExperimentDataManager:
         # check for similar filename and append 000x at end if true
         if not overwrite:
             filename = self.change_filename_if_double(
-                filename=filename, dirname=dirname
+                filename=filename, dirname=dirname, extension=extension
             )
+        else:
+            self.filename_index.add(dirname, filename)
 
         # put everything together
         current_run_savepath = os.path.join(dirname, filename + extension)
@@ -582,12 +1107,18 @@ class ExperimentDataManager:
         return_fpath: bool = False,
         dirname: str = None,
         overwrite: bool = False,
+        compress: bool = True,
     ):
         if not self.dry_run:
+            self.write_deferred_logging()
+            compression = self.compression if compress else None
+            extension = ".json"
+            if compression is not None:
+                extension += COMPRESSION_EXTENSIONS[compression]
             fpath = self.get_savepath(
                 dirname=dirname,
                 filename=filename,
-                extension=".json",
+                extension=extension,
                 subfolder=category,
                 add_timestamp=add_timestamp,
                 overwrite=overwrite,
@@ -599,14 +1130,50 @@ class ExperimentDataManager:
 
             print("saving object called {}".format(os.path.basename(fpath)))
 
-            jobj_str = extended_dumps(jobj)
-            fstream = io.open(fpath, "w+")
-            fstream.write(jobj_str)
-            print("wrote json to {}".format(fpath))
-            fstream.close()
+            if self.async_writes:
+                # copy so that the caller can keep modifying its objects
+                self.writer.submit(
+                    self.write_json, fpath, copy.deepcopy(jobj), compression
+                )
+            else:
+                self.write_json(fpath, jobj, compression)
+            # indexed once written, the writer runs things in order
+            key = self.cache_keys.get(self.run_number)
+            if key is not None and dirname is None and category == constants.DATA_DIR:
+                index = partial(
+                    add_to_index,
+                    self.data_folder,
+                    key,
+                    self.current_saving_dirname,
+                    os.path.relpath(fpath, self.current_saving_dirname),
+                )
+                if self.async_writes:
+                    self.writer.submit(index)
+                else:
+                    index()
             if return_fpath:
                 return fpath
 
+    def write_json(self, fpath: str, jobj: dict, compression: str = None):
+        # stream to the file so that memory doesn't blow up for big objects,
+        # it only replaces fpath once everything is encoded
+        with atomic_path(fpath) as tmp_fpath:
+            with open_json_file(
+                tmp_fpath,
+                "w+",
+                compression=compression,
+                compression_level=self.compression_level,
+            ) as fstream:
+                extended_dump(
+                    jobj,
+                    fstream,
+                    sidecar_dirname=os.path.dirname(fpath),
+                    sidecar_stem=os.path.basename(fpath).split(".")[0],
+                    sidecar_threshold=self.array_sidecar_threshold,
+                    ndarray_format=self.ndarray_format,
+                )
+        print("wrote json to {}".format(fpath))
+
     def var_dump(
         self,
         large_array_threshold: int = -1,
@@ -640,7 +1207,7 @@ class ExperimentDataManager:
 
     def save_figure(
         self,
-        fig: plt.Figure,
+        fig: "plt.Figure",
         filename: str = None,
         add_timestamp: bool = False,
         save_data: str = None,
@@ -657,7 +1224,59 @@ class ExperimentDataManager:
             "nice-y",
         ] = "regular",
     ):
+        import matplotlib
+
         if not self.dry_run:
+            self.write_deferred_logging()
+            # the size is set first, it is part of the fingerprint
+            bbox_inches = None
+            figsize = matplotlib.rcParams["figure.figsize"]
+            if expand_figure:
+                bbox_inches = "tight"
+
+            # a full figure fits snugly in a revtex column
+            subplot_row_scaling = True
+            if michael_scaling:
+                figsize = (figsize[0], figsize[1] * 1.5)
+            if subplot_row_scaling:
+                gridspec = fig.get_axes()[0].get_gridspec()
+                figsize = (figsize[0], figsize[1] * gridspec.nrows / 2)
+            if fig_shape == "regular":
+                pass
+            elif fig_shape == "half-y":
+                figsize = (figsize[0], figsize[1] / 2)
+            elif fig_shape == "double-y":
+                figsize = (figsize[0], figsize[1] * 2)
+            elif fig_shape == "nice-y":
+                figsize = (figsize[0], figsize[1] * 1.5)
+            elif fig_shape == "half-x":
+                figsize = (figsize[0] / 2, figsize[1])
+            elif fig_shape == "half-size":
+                figsize = (figsize[0] / 2, figsize[1] / 2)
+            elif fig_shape == "page-wide":
+                figsize = (figsize[0] * 2, figsize[1])
+            elif fig_shape == "double-size":
+                figsize = (figsize[0] * 2, figsize[1] * 2)
+            fig.set_size_inches(figsize[0], figsize[1])
+            savefig_kwargs = {
+                "format": "pdf",
+                "bbox_inches": bbox_inches,
+                "pad_inches": 0.01,
+            }
+            saved_fpath = None
+            if self.dedupe_figures:
+                fingerprint = figure_fingerprint(fig, **savefig_kwargs)
+                saved = self.find_saved_figure(fingerprint)
+                if saved is not None:
+                    saved_fpath = os.path.join(self.current_fig_dir, saved["filename"])
+                    # same name asked again, nothing to do
+                    if filename is None or (
+                        filename == saved["name"] and not add_timestamp
+                    ):
+                        print(
+                            "figure unchanged, already saved to {}".format(saved_fpath)
+                        )
+                        return
             if filename is None:
                 filename = name_builder(["foods.txt"])
             figure_fpath = self.get_savepath(
@@ -677,6 +1296,26 @@ class ExperimentDataManager:
                     jobj=fig_data,
                     category=constants.FIG_DIR,
                 )
+            elif save_data in ("npz", "npz_compressed"):
+                # the arrays go in one npz and a small json says what is where.
+                # npz is memory mapped when loaded, npz_compressed is smaller
+                fig_data, arrays = get_figure_arrays(fig=fig)
+                arrays_fpath = self.get_savepath(
+                    filename + "_arrays",
+                    extension=".npz",
+                    subfolder=constants.FIG_DIR,
+                    add_timestamp=add_timestamp,
+                )
+                if save_data == "npz_compressed":
+                    np.savez_compressed(arrays_fpath, **arrays)
+                else:
+                    np.savez(arrays_fpath, **arrays)
+                fig_data["arrays"] = os.path.basename(arrays_fpath)
+                self.save_dict(
+                    filename=filename + "_data",
+                    jobj=fig_data,
+                    category=constants.FIG_DIR,
+                )
             elif save_data == "pickle":
                 experiment_fpath = self.get_savepath(
                     filename + "_data",
@@ -684,43 +1323,21 @@ class ExperimentDataManager:
                     subfolder=constants.FIG_DIR,
                     add_timestamp=add_timestamp,
                 )
-                pkl = pickle.dumps(obj=fig)
-                out_file = io.open(experiment_fpath, "wb+")
-                out_file.write(pkl)
+                with io.open(experiment_fpath, "wb+") as out_file:
+                    pickle.dump(fig, out_file, protocol=pickle.HIGHEST_PROTOCOL)
             # saving the figure
             # the figure needs to be saved after the data as sometimes
             # one gets a TypeError from a faulty cache
             # since you can't pickle a _io.BufferedWriter
-            bbox_inches = None
-            figsize = plt.rcParams["figure.figsize"]
-            if expand_figure:
-                bbox_inches = "tight"
-
-            # a full figure fits snugly in a revtex column
-            subplot_row_scaling = True
-            if michael_scaling:
-                figsize = (figsize[0], figsize[1] * 1.5)
-            if subplot_row_scaling:
-                gridspec = fig.get_axes()[0].get_gridspec()
-                figsize = (figsize[0], figsize[1] * gridspec.nrows / 2)
-            if fig_shape == "regular":
-                pass
-            elif fig_shape == "half-y":
-                figsize = (figsize[0], figsize[1] / 2)
-            elif fig_shape == "double-y":
-                figsize = (figsize[0], figsize[1] * 2)
-            elif fig_shape == "nice-y":
-                figsize = (figsize[0], figsize[1] * 1.5)
-            elif fig_shape == "half-x":
-                figsize = (figsize[0] / 2, figsize[1])
-            elif fig_shape == "half-size":
-                figsize = (figsize[0] / 2, figsize[1] / 2)
-            elif fig_shape == "page-wide":
-                figsize = (figsize[0] * 2, figsize[1])
-            elif fig_shape == "double-size":
-                figsize = (figsize[0] * 2, figsize[1] * 2)
-            fig.set_size_inches(figsize[0], figsize[1])
-            fig.savefig(
-                figure_fpath, format="pdf", bbox_inches=bbox_inches, pad_inches=0.01
-            )
-            print("saved figure to {}".format(figure_fpath))
+            if saved_fpath is not None:
+                link_figure(saved_fpath, figure_fpath)
+                print(
+                    "saved figure to {} (same as {})".format(figure_fpath, saved_fpath)
+                )
+            elif self.async_figures:
+                self.render_figure_async(fig, figure_fpath, **savefig_kwargs)
+            else:
+                fig.savefig(figure_fpath, **savefig_kwargs)
+                print("saved figure to {}".format(figure_fpath))
+            if self.dedupe_figures and saved_fpath is None:
+                self.add_figure_fingerprint(fingerprint, figure_fpath, filename)
@@ -0,0 +1,222 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from data_manager.atomic import atomic_path
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+
+# save_figure skips rendering a figure that was already saved in the run.
+# the fingerprint is a hash of what the artists draw (data, colors, styles,
+# text, limits) and of how the figure gets saved, so it is a lot cheaper than
+# drawing it. each figures folder has a small index fingerprint -> pdf, read
+# once, so that the folder is never scanned
+
+FINGERPRINTS_FILENAME = "__fingerprints.json"
+# get_<name> of every artist that has it
+ARTIST_PROPERTIES = (
+    "visible",
+    "alpha",
+    "zorder",
+    "label",
+    "color",
+    "facecolor",
+    "edgecolor",
+    "linestyle",
+    "linewidth",
+    "drawstyle",
+    "marker",
+    "markersize",
+    "markerfacecolor",
+    "markeredgecolor",
+    "hatch",
+    "cmap",
+    "clim",
+    "extent",
+    "interpolation",
+    "text",
+    "position",
+    "fontsize",
+    "fontweight",
+    "rotation",
+    "horizontalalignment",
+    "verticalalignment",
+    "xlim",
+    "ylim",
+    "xscale",
+    "yscale",
+    "aspect",
+)
+# spines, legend frames and the like are placed when drawing, from the
+# limits or the text in them, only their style counts
+PLACED_PROPERTIES = (
+    "visible",
+    "alpha",
+    "zorder",
+    "facecolor",
+    "edgecolor",
+    "linestyle",
+    "linewidth",
+    "hatch",
+)
+# the data, where it is
+ARTIST_ARRAYS = ("offsets", "sizes", "array", "coordinates", "xy")
+
+
+def update_with_array(h, arr):
+    if isinstance(arr, np.ma.MaskedArray):
+        update_with_array(h, np.ma.getmaskarray(arr))
+        arr = np.ma.getdata(arr)
+    arr = np.asarray(arr)
+    h.update(f"{arr.dtype.str}{arr.shape}".encode("utf8"))
+    if arr.dtype.hasobject:
+        h.update(repr(arr.tolist()).encode("utf8"))
+    else:
+        h.update(np.ascontiguousarray(arr).view(np.uint8).data if arr.size else b"")
+
+
+def update_with_value(h, value):
+    if isinstance(value, np.ndarray):
+        update_with_array(h, value)
+    elif value is None or isinstance(value, (str, bool, int, float, np.generic)):
+        h.update(repr(value).encode("utf8"))
+    elif isinstance(value, (tuple, list)):
+        h.update(b"[")
+        for v in value:
+            update_with_value(h, v)
+        h.update(b"]")
+    else:
+        # colormaps, norms, ... the repr of these has the address in it
+        h.update(str(getattr(value, "name", type(value).__name__)).encode("utf8"))
+
+
+def update_with_axis_ticks(h, axis, which: str):
+    if which == "major":
+        locs = axis.get_majorticklocs()
+        formatter = axis.get_major_formatter()
+    else:
+        locs = axis.get_minorticklocs()
+        formatter = axis.get_minor_formatter()
+    update_with_array(h, locs)
+    # the formatter is given the locations like when drawing
+    update_with_value(h, formatter.format_ticks(locs))
+    update_with_value(h, formatter.get_offset())
+    if hasattr(axis, "get_tick_params"):
+        tick_params = axis.get_tick_params(which=which)
+    else:
+        # before matplotlib 3.7
+        tick_params = getattr(axis, f"_{which}_tick_kw")
+    for k in sorted(tick_params.keys()):
+        update_with_value(h, k)
+        update_with_value(h, tick_params[k])
+
+
+def update_with_artist(h, artist):
+    from matplotlib.axis import Axis
+    from matplotlib.lines import Line2D
+    from matplotlib.patches import FancyBboxPatch, Patch
+    from matplotlib.spines import Spine
+
+    h.update(type(artist).__name__.encode("utf8"))
+    if hasattr(artist, "update_scalarmappable"):
+        # the colors of the values, drawing does it too
+        artist.update_scalarmappable()
+    placed = isinstance(artist, (Spine, FancyBboxPatch))
+    for name in PLACED_PROPERTIES if placed else ARTIST_PROPERTIES:
+        getter = getattr(artist, f"get_{name}", None)
+        if getter is None:
+            continue
+        try:
+            value = getter()
+        except Exception:
+            continue
+        h.update(name.encode("utf8"))
+        update_with_value(h, value)
+    if hasattr(artist, "xy") and hasattr(artist, "get_anncoords"):
+        # where an annotation points
+        update_with_value(h, artist.xy)
+    if isinstance(artist, Line2D):
+        update_with_array(h, artist.get_xdata(orig=True))
+        update_with_array(h, artist.get_ydata(orig=True))
+    elif isinstance(artist, Axis):
+        # the ticks are made when drawing, their locations, labels and
+        # params (which has the grid and what is visible) say what they will be
+        update_with_axis_ticks(h, artist, "major")
+        update_with_axis_ticks(h, artist, "minor")
+        # the label is moved when drawing
+        for value in (
+            artist.label.get_text(),
+            artist.label.get_fontsize(),
+            artist.label.get_color(),
+            artist.label.get_visible(),
+        ):
+            update_with_value(h, value)
+        return
+    elif placed:
+        for child in artist.get_children():
+            update_with_artist(h, child)
+        return
+    for name in ARTIST_ARRAYS:
+        getter = getattr(artist, f"get_{name}", None)
+        if getter is None:
+            continue
+        try:
+            value = getter()
+        except Exception:
+            continue
+        h.update(name.encode("utf8"))
+        update_with_value(h, value)
+    if isinstance(artist, Patch):
+        # in data coordinates, doesn't depend on the size of the figure
+        update_with_array(h, artist.get_path().vertices)
+        update_with_array(h, artist.get_patch_transform().get_matrix())
+    elif hasattr(artist, "get_paths") and not hasattr(artist, "get_coordinates"):
+        # fill_between and the like, the paths are the data
+        for path in artist.get_paths():
+            update_with_array(h, path.vertices)
+    for child in artist.get_children():
+        update_with_artist(h, child)
+
+
+def figure_fingerprint(fig: "plt.Figure", **savefig_kwargs) -> str:
+    # same figure saved the same way -> same fingerprint
+    import matplotlib
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(matplotlib.__version__.encode("utf8"))
+    h.update(json.dumps(savefig_kwargs, sort_keys=True, default=repr).encode("utf8"))
+    update_with_value(h, fig.get_dpi())
+    update_with_array(h, fig.get_size_inches())
+    for axes in fig.get_axes():
+        update_with_array(h, axes.get_position(original=True).bounds)
+    update_with_artist(h, fig)
+    return h.hexdigest()
+
+
+def read_fingerprints(dirname: os.PathLike) -> dict:
+    fpath = os.path.join(dirname, FINGERPRINTS_FILENAME)
+    if not os.path.isfile(fpath):
+        return {}
+    with io.open(fpath, "r", encoding="utf8") as fstream:
+        return json.load(fstream)
+
+
+def write_fingerprints(dirname: os.PathLike, fingerprints: dict):
+    fpath = os.path.join(dirname, FINGERPRINTS_FILENAME)
+    with atomic_path(fpath) as tmp_fpath:
+        with io.open(tmp_fpath, "w", encoding="utf8") as fstream:
+            json.dump(fingerprints, fstream, indent=4)
+
+
+def link_figure(src: os.PathLike, dst: os.PathLike):
+    # a hard link costs nothing, a copy where they aren't supported
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
@@ -1,25 +1,21 @@
+import base64
+import importlib
+import io
+import os
+import sys
 from json import JSONDecoder, JSONEncoder
-from typing import Any
+from typing import Any, Callable
 
 import numpy as np
-from pathlib import Path
+from pathlib import Path, PurePath
 
-# don't need these libraries but they're useful for me.
-try:
-    import cirq
+import data_manager.constants as constants
+from data_manager.atomic import atomic_path
 
-    CIRQ_TYPES = (
-        cirq.Qid,
-        cirq.Gate,
-        cirq.Operation,
-        cirq.Moment,
-        cirq.AbstractCircuit,
-        cirq.PauliSum,
-        cirq.PauliString,
-    )
-    HAS_CIRQ = True
-except ImportError:
-    HAS_CIRQ = False
+# don't need these libraries but they're useful for me.
+# they are slow to import, so they are only imported the first time
+# an object from them needs to be saved or loaded
+OPTIONAL_MODULES = {}
 
 
 # try:
@@ -31,164 +27,488 @@ except ImportError:
 #     HAS_UNC = False
 
 
-try:
-    import openfermion as of
-
-    OF_TYPES = (of.SymbolicOperator,)
-    HAS_OF = True
-except ImportError:
-    HAS_OF = False
-
-
-try:
-    import sympy
-
-    HAS_SYMPY = True
-except ImportError:
-    HAS_SYMPY = False
+def import_optional(name: str):
+    # None if not installed
+    if name not in OPTIONAL_MODULES:
+        try:
+            OPTIONAL_MODULES[name] = importlib.import_module(name)
+        except ImportError:
+            OPTIONAL_MODULES[name] = None
+    return OPTIONAL_MODULES[name]
 
 
-try:
-    import qiskit
-    from qiskit_ibm_runtime import RuntimeEncoder, RuntimeDecoder
+def get_cirq_types(cirq) -> tuple:
+    return (
+        cirq.Qid,
+        cirq.Gate,
+        cirq.Operation,
+        cirq.Moment,
+        cirq.AbstractCircuit,
+        cirq.PauliSum,
+        cirq.PauliString,
+    )
 
-    HAS_QISKIT_JSON = True
-except ImportError:
-    HAS_QISKIT_JSON = False
 
 TYPE_FLAG = "type"
 ARGS_FLAG = "args"
 KWARGS_FLAG = "kwargs"
+# arrays saved next to the json file
+SIDECAR_TYPE = "ndarray_file"
+# raw buffer of numeric arrays as base64
+PACKED_TYPE = "ndarray_b64"
+NDARRAY_FORMATS = ("list", "base64")
+# qiskit_ibm_runtime tags its own objects with this
+QISKIT_FLAG = "__type__"
 
 
 from datetime import datetime
 
 
 class ExtendedJSONEncoder(JSONEncoder):
-    def default(self, obj: Any) -> dict:
-        if isinstance(obj, complex):
-            return {
-                TYPE_FLAG: "complex",
-                KWARGS_FLAG: {"real": obj.real, "imag": obj.imag},
-            }
-        elif isinstance(obj, Path):
-            return {
-                TYPE_FLAG: "path",
-                ARGS_FLAG: str(obj),
-            }
-        elif isinstance(obj, np.ndarray):
-            return {
-                TYPE_FLAG: obj.__class__.__name__,
-                ARGS_FLAG: obj.tolist(),
-                KWARGS_FLAG: {"dtype": str(obj.dtype)},
-            }
-        elif isinstance(obj, datetime):
-            return {TYPE_FLAG: "datetime", ARGS_FLAG: obj.isoformat()}
-        elif obj.__class__.__module__ == np.__name__:
-            # longdouble.item() casts to longdouble. What's the point?
-            if type(obj.item()) is type(obj):
-                return {
-                    TYPE_FLAG: obj.__class__.__name__,
-                    ARGS_FLAG: obj.astype(float).item(),
-                }
-            return {
-                TYPE_FLAG: obj.__class__.__name__,
-                ARGS_FLAG: obj.tolist(),
-            }
-        elif HAS_CIRQ and isinstance(obj, CIRQ_TYPES):
-            return {
-                TYPE_FLAG: obj.__class__.__name__,
-                ARGS_FLAG: cirq.to_json(obj, indent=4),
-            }
-
-        elif (HAS_OF and isinstance(obj, OF_TYPES)) or (
-            HAS_SYMPY and isinstance(obj, sympy.Symbol)
+    def __init__(
+        self,
+        *args,
+        sidecar_dirname: os.PathLike = None,
+        sidecar_stem: str = "array",
+        sidecar_threshold: int = None,
+        ndarray_format: str = "list",
+        **kwargs,
+    ):
+        # arrays bigger than sidecar_threshold bytes are saved as .npy files
+        # in sidecar_dirname, the json only keeps a reference to them
+        super().__init__(*args, **kwargs)
+        if ndarray_format not in NDARRAY_FORMATS:
+            raise ValueError(
+                f"expected ndarray_format to be one of {NDARRAY_FORMATS}, got: {ndarray_format}"
+            )
+        self.ndarray_format = ndarray_format
+        self.sidecar_dirname = sidecar_dirname
+        self.sidecar_stem = sidecar_stem
+        self.sidecar_threshold = sidecar_threshold
+        self.n_sidecars = 0
+
+    def use_sidecar(self, obj: np.ndarray) -> bool:
+        return (
+            self.sidecar_dirname is not None
+            and self.sidecar_threshold is not None
+            and obj.nbytes > self.sidecar_threshold
+            and not obj.dtype.hasobject
+        )
+
+    def save_sidecar(self, obj: np.ndarray) -> dict:
+        sidecar_dir = os.path.join(self.sidecar_dirname, constants.SIDECAR_DIR)
+        os.makedirs(sidecar_dir, exist_ok=True)
+        filename = f"{self.sidecar_stem}_{self.n_sidecars:05}.npy"
+        self.n_sidecars += 1
+        fpath = os.path.join(sidecar_dir, filename)
+        # write next to the target and swap, someone might have the old one mmapped
+        with atomic_path(fpath) as tmp_fpath:
+            with io.open(tmp_fpath, "wb") as fstream:
+                np.save(fstream, obj, allow_pickle=False)
+        return {
+            TYPE_FLAG: SIDECAR_TYPE,
+            KWARGS_FLAG: {
+                # always forward slashes so that the files can be moved around
+                "path": f"{constants.SIDECAR_DIR}/{filename}",
+                "dtype": str(obj.dtype),
+                "shape": list(obj.shape),
+            },
+        }
+
+    def pack_ndarray(self, obj: np.ndarray) -> dict:
+        if obj.dtype.byteorder == ">" or (
+            obj.dtype.byteorder == "=" and sys.byteorder == "big"
         ):
-            return {TYPE_FLAG: obj.__class__.__name__, ARGS_FLAG: str(obj)}
-
-        elif HAS_QISKIT_JSON:
-            try:
-                return RuntimeEncoder().default(obj)
-            except Exception:
-                pass
-        elif "__to_json__" in obj.__class__.__dict__.keys():
-            return obj.__to_json__
+            byteorder = "big"
+        else:
+            byteorder = "little"
+        return {
+            TYPE_FLAG: PACKED_TYPE,
+            KWARGS_FLAG: {
+                "data": base64.b64encode(np.ascontiguousarray(obj).data).decode(
+                    "ascii"
+                ),
+                "dtype": obj.dtype.name,
+                "shape": list(obj.shape),
+                "byteorder": byteorder,
+            },
+        }
+
+    def encode_ndarray(self, obj: np.ndarray) -> dict:
+        if self.use_sidecar(obj):
+            return self.save_sidecar(obj)
+        # only plain numbers can be packed, the rest goes through tolist
+        if self.ndarray_format == "base64" and obj.dtype.kind in "biufc":
+            return self.pack_ndarray(obj)
+        # sidecar arrays come back as memmaps, which should be saved as arrays
+        if isinstance(obj, np.memmap):
+            type_name = "ndarray"
+        else:
+            type_name = obj.__class__.__name__
+        return {
+            TYPE_FLAG: type_name,
+            ARGS_FLAG: obj.tolist(),
+            KWARGS_FLAG: {"dtype": str(obj.dtype)},
+        }
+
+    def default(self, obj: Any) -> dict:
+        if isinstance(obj, LazyValue):
+            # gets encoded again as whatever it turns out to be
+            return obj.materialize()
+        if isinstance(obj, np.ndarray):
+            return self.encode_ndarray(obj)
+        encoder = get_encoder(obj.__class__)
+        if encoder is not None:
+            return encoder(obj)
         return super().default(obj)
 
 
+class LazyValue:
+    # stands in for a decoded value, which is only built the first time
+    # it is used (or when materialize is called)
+    __slots__ = ("constructor", "args", "kwargs", "value", "is_materialized")
+
+    def __init__(self, constructor: Callable, args: tuple, kwargs: dict):
+        self.constructor = constructor
+        self.args = args
+        self.kwargs = kwargs
+        self.value = None
+        self.is_materialized = False
+
+    def materialize(self) -> Any:
+        if not self.is_materialized:
+            self.value = self.constructor(*self.args, **self.kwargs)
+            self.is_materialized = True
+            self.args = self.kwargs = None
+        return self.value
+
+    def __getattr__(self, name: str):
+        # slots that are not set yet (e.g. while unpickling) end up here
+        if name in LazyValue.__slots__:
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+    def __reduce__(self):
+        # pickles as the actual value
+        return (identity, (self.materialize(),))
+
+    def __repr__(self):
+        if self.is_materialized:
+            return repr(self.value)
+        return f"<lazy {getattr(self.constructor, '__name__', 'value')}>"
+
+
+def identity(x: Any) -> Any:
+    return x
+
+
+def make_forwarding_method(name: str):
+    def forward(self, *args, **kwargs):
+        return getattr(self.materialize(), name)(*args, **kwargs)
+
+    forward.__name__ = name
+    return forward
+
+
+# special methods are looked up on the class, so __getattr__ doesn't see them
+for name in (
+    "__str__",
+    "__format__",
+    "__len__",
+    "__iter__",
+    "__reversed__",
+    "__contains__",
+    "__getitem__",
+    "__setitem__",
+    "__delitem__",
+    "__eq__",
+    "__ne__",
+    "__lt__",
+    "__le__",
+    "__gt__",
+    "__ge__",
+    "__hash__",
+    "__bool__",
+    "__int__",
+    "__float__",
+    "__complex__",
+    "__index__",
+    "__array__",
+    "__neg__",
+    "__pos__",
+    "__abs__",
+    "__add__",
+    "__radd__",
+    "__sub__",
+    "__rsub__",
+    "__mul__",
+    "__rmul__",
+    "__matmul__",
+    "__rmatmul__",
+    "__truediv__",
+    "__rtruediv__",
+    "__floordiv__",
+    "__rfloordiv__",
+    "__mod__",
+    "__pow__",
+    "__rpow__",
+    "__call__",
+):
+    setattr(LazyValue, name, make_forwarding_method(name))
+
+
+def materialize(obj: Any) -> Any:
+    # builds every lazy value in nested dicts and lists
+    if isinstance(obj, LazyValue):
+        return obj.materialize()
+    elif isinstance(obj, dict):
+        return {k: materialize(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [materialize(v) for v in obj]
+    return obj
+
+
 class ExtendedJSONDecoder(JSONDecoder):
-    def __init__(self):
+    def __init__(
+        self, *, dirname: os.PathLike = None, mmap_mode: str = "r", lazy: bool = False
+    ):
+        # dirname is the folder of the json file, sidecar paths are relative to it
+        # lazy returns placeholders for the heavy values (arrays, cirq objects...)
+        self.dirname = dirname
+        self.mmap_mode = mmap_mode
+        self.lazy = lazy
         JSONDecoder.__init__(self, object_hook=self.object_hook)
 
+    def load_sidecar(self, path: str, dtype: str = None, shape: list = None):
+        if self.dirname is not None:
+            path = os.path.join(self.dirname, path)
+        return np.load(path, mmap_mode=self.mmap_mode, allow_pickle=False)
+
     def object_hook(self, dct: dict) -> Any:
         if TYPE_FLAG in dct:
-            t = get_type(dct[TYPE_FLAG])
-            args = []
-            kwargs = {}
-            if ARGS_FLAG in dct:
-                args.append(dct[ARGS_FLAG])
-            if KWARGS_FLAG in dct:
-                kwargs.update(dct[KWARGS_FLAG])
+            if dct[TYPE_FLAG] == SIDECAR_TYPE:
+                t = self.load_sidecar
+            else:
+                t = get_type(dct[TYPE_FLAG])
+            args = (dct[ARGS_FLAG],) if ARGS_FLAG in dct else ()
+            kwargs = dct.get(KWARGS_FLAG, {})
+            if self.lazy and is_heavy_type(t):
+                return LazyValue(t, args, kwargs)
             return t(*args, **kwargs)
-        elif HAS_QISKIT_JSON:
-            return RuntimeDecoder().object_hook(dct)
+        elif QISKIT_FLAG in dct:
+            runtime_decoder = get_runtime_decoder()
+            if runtime_decoder is not None:
+                return runtime_decoder.object_hook(dct)
         return dct
 
 
-# A+ type hinting
-def try_get_attr(cls: np.__class__, obj: Any):
-    try:
-        return getattr(cls, obj)
-    except Exception:
-        return None
+def unpack_ndarray(data: str, dtype: str, shape: list, byteorder: str = "little"):
+    dtype = np.dtype(dtype).newbyteorder("<" if byteorder == "little" else ">")
+    # bytearray so that the array is writable
+    return np.frombuffer(bytearray(base64.b64decode(data)), dtype=dtype).reshape(shape)
 
 
-def get_type(s: str) -> Any:
-    try:
-        # make it fail fast if needed
-        # somehow getattr(__builtins__, "complex") raises an error. why?
-        assert s == "complex"
-        return complex
-    except Exception:
-        pass
-    try:
-        assert s == "datetime"
-        return datetime.fromisoformat
-    except Exception:
-        pass
+# class -> function returning the tagged dict, for the registered classes
+TYPE_ENCODERS: dict[type, Callable[[Any], dict]] = {}
+# the same for every class seen, resolved through the mro once, misses too (None)
+ENCODER_CACHE: dict[type, Callable[[Any], dict]] = {}
+# type tag -> constructor called with the args and kwargs of the tagged dict
+TYPE_DECODERS: dict[str, Callable] = {}
+
+RUNTIME_CODERS = {}
+
+
+def get_runtime_encoder():
+    if "encoder" not in RUNTIME_CODERS:
+        qiskit_ibm_runtime = import_optional("qiskit_ibm_runtime")
+        if qiskit_ibm_runtime is None:
+            RUNTIME_CODERS["encoder"] = None
+        else:
+            RUNTIME_CODERS["encoder"] = qiskit_ibm_runtime.RuntimeEncoder()
+    return RUNTIME_CODERS["encoder"]
+
+
+def get_runtime_decoder():
+    if "decoder" not in RUNTIME_CODERS:
+        qiskit_ibm_runtime = import_optional("qiskit_ibm_runtime")
+        if qiskit_ibm_runtime is None:
+            RUNTIME_CODERS["decoder"] = None
+        else:
+            RUNTIME_CODERS["decoder"] = qiskit_ibm_runtime.RuntimeDecoder()
+    return RUNTIME_CODERS["decoder"]
+
+
+def register_type(
+    cls: type,
+    tag: str = None,
+    encoder: Callable[[Any], Any] = None,
+    decoder: Callable[[Any], Any] = None,
+) -> type:
+    # encoder turns the object into something json can handle, decoder does the
+    # reverse. By default they are obj.__to_json__() and cls.__from_json__
+    # (or cls itself). Returns cls so that it can be used as a decorator
+    if tag is None:
+        tag = cls.__name__
+    if encoder is None:
+        if not hasattr(cls, "__to_json__"):
+            raise TypeError(f"{cls.__name__} has no __to_json__ and no encoder given")
+        encoder = cls.__to_json__
+    if decoder is None:
+        decoder = getattr(cls, "__from_json__", cls)
+
+    def encode(obj: Any) -> dict:
+        return {TYPE_FLAG: tag, ARGS_FLAG: encoder(obj)}
+
+    # drop cached subclass lookups, they might resolve differently now.
+    # registered subclasses keep their own encoder
+    for k in [k for k in ENCODER_CACHE.keys() if issubclass(k, cls)]:
+        del ENCODER_CACHE[k]
+    TYPE_ENCODERS[cls] = encode
+    TYPE_DECODERS[tag] = decoder
+    return cls
+
+
+def get_encoder(cls: type) -> Callable[[Any], dict]:
     try:
-        # hate this
-        assert getattr(np, s).__module__ == np.__name__
-        if s == "ndarray":
-            return np.array
-        return getattr(np, s)
-    except Exception:
+        return ENCODER_CACHE[cls]
+    except KeyError:
         pass
+    encoder = None
+    for base in cls.__mro__:
+        if base in TYPE_ENCODERS:
+            encoder = TYPE_ENCODERS[base]
+            break
+    if encoder is None:
+        encoder = find_encoder(cls)
+    ENCODER_CACHE[cls] = encoder
+    return encoder
+
+
+def find_encoder(cls: type) -> Callable[[Any], dict]:
+    # check the module names first so that we don't import anything for
+    # nothing. all of the mro, user classes can subclass these
+    module_names = {c.__module__.split(".")[0] for c in cls.__mro__}
+    if "cirq" in module_names:
+        cirq = import_optional("cirq")
+        if cirq is not None and issubclass(cls, get_cirq_types(cirq)):
+            return encode_cirq
+    if "openfermion" in module_names:
+        of = import_optional("openfermion")
+        if of is not None and issubclass(cls, of.SymbolicOperator):
+            return encode_str
+    if "sympy" in module_names:
+        sympy = import_optional("sympy")
+        if sympy is not None and issubclass(cls, sympy.Symbol):
+            return encode_str
+    if module_names & {"qiskit", "qiskit_ibm_runtime"}:
+        if get_runtime_encoder() is not None:
+            return encode_qiskit
+    # user classes that were not registered still get saved, as the plain
+    # value since there is no type to decode them with.
+    # register_type(cls) to get the object back when loading
+    if hasattr(cls, "__to_json__"):
+        return encode_to_json
+    return None
+
+
+def encode_complex(obj: complex) -> dict:
+    return {
+        TYPE_FLAG: "complex",
+        KWARGS_FLAG: {"real": obj.real, "imag": obj.imag},
+    }
+
+
+def encode_path(obj: PurePath) -> dict:
+    return {TYPE_FLAG: "path", ARGS_FLAG: str(obj)}
+
+
+def encode_datetime(obj: datetime) -> dict:
+    return {TYPE_FLAG: "datetime", ARGS_FLAG: obj.isoformat()}
+
+
+def encode_numpy_scalar(obj: np.generic) -> dict:
+    item = obj.item()
+    # longdouble.item() casts to longdouble. What's the point?
+    if type(item) is type(obj):
+        item = obj.astype(float).item()
+    return {TYPE_FLAG: obj.__class__.__name__, ARGS_FLAG: item}
+
+
+def encode_cirq(obj: Any) -> dict:
+    return {
+        TYPE_FLAG: obj.__class__.__name__,
+        ARGS_FLAG: import_optional("cirq").to_json(obj, indent=4),
+    }
+
+
+def encode_str(obj: Any) -> dict:
+    return {TYPE_FLAG: obj.__class__.__name__, ARGS_FLAG: str(obj)}
+
+
+def encode_to_json(obj: Any) -> Any:
+    return obj.__to_json__()
+
+
+def encode_qiskit(obj: Any) -> dict:
+    # falls back to JSONEncoder.default, which raises the usual TypeError
+    return get_runtime_encoder().default(obj)
+
+
+TYPE_ENCODERS.update(
+    {
+        complex: encode_complex,
+        # before np.generic in the mro, but was always saved as a complex
+        np.complex128: encode_complex,
+        PurePath: encode_path,
+        datetime: encode_datetime,
+        np.generic: encode_numpy_scalar,
+    }
+)
+TYPE_DECODERS.update(
+    {
+        "complex": complex,
+        "datetime": datetime.fromisoformat,
+        "path": Path,
+        "ndarray": np.array,
+        PACKED_TYPE: unpack_ndarray,
+    }
+)
+
+
+# not worth deferring
+CHEAP_TYPES = (complex, datetime.fromisoformat, Path)
+
+
+def is_heavy_type(t: Callable) -> bool:
+    if t in CHEAP_TYPES:
+        return False
+    return not (isinstance(t, type) and issubclass(t, np.generic))
+
+
+def read_cirq_json(x: str):
+    return import_optional("cirq").read_json(json_text=x)
+
+
+def get_type(s: str) -> Any:
     try:
-        assert s == "path"
-        return Path
-    except Exception:
+        return TYPE_DECODERS[s]
+    except KeyError:
         pass
+    t = find_type(s)
+    TYPE_DECODERS[s] = t
+    return t
+
+
+def find_type(s: str) -> Any:
     # the attr is the class with desired constructor
-    # would be nice to do a for loop without including the non-imported module
-    # names explicitly
-    if HAS_CIRQ:
-        try:
-            getattr(cirq, s)
-            return lambda x: cirq.read_json(json_text=x)
-        # TODO: figure out which errors would show up
-        except Exception:
-            pass
-    if HAS_SYMPY:
-        x = try_get_attr(sympy, s)
-        if x is not None:
-            return x
-    if HAS_OF:
-        x = try_get_attr(of, s)
-        if x is not None:
-            return x
-    if HAS_QISKIT_JSON:
-        x = try_get_attr(qiskit, s)
-        if x is not None:
-            return x
+    x = getattr(np, s, None)
+    if x is not None and getattr(x, "__module__", None) == np.__name__:
+        return x
+    cirq = import_optional("cirq")
+    if cirq is not None and hasattr(cirq, s):
+        return read_cirq_json
+    for module_name in ("sympy", "openfermion", "qiskit"):
+        module = import_optional(module_name)
+        if module is not None and hasattr(module, s):
+            return getattr(module, s)
     raise TypeError("{} is an unknown type".format(s))
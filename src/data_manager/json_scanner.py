@@ -0,0 +1,207 @@
+import bz2
+import gzip
+import io
+import lzma
+import mmap
+import os
+import re
+from typing import Any, Iterable
+
+from data_manager.json_extender import ExtendedJSONDecoder
+from data_manager.utils import detect_compression
+
+# picks values out of a json file without parsing the rest of it.
+# the unwanted parts are skipped with regexes over the raw bytes
+# (memory mapped if the file is not compressed) and only the selected
+# values go through the decoder and its object_hook
+
+WHITESPACE = re.compile(rb"[ \t\n\r]*")
+STRUCTURE = (b'"', b"[", b"]", b"{", b"}")
+OPENING = (b"[", b"{")
+BACKSLASH = ord("\\")
+SCALAR_END = re.compile(rb"[,}\]\s]")
+
+DECOMPRESSORS = {"gzip": gzip.open, "bz2": bz2.open, "lzma": lzma.open}
+
+
+class KeyNode:
+    def __init__(self):
+        # requested keys ending here
+        self.labels = []
+        self.children = {}
+
+
+def split_key(key: str) -> list:
+    # "params.n_qubits" -> ["params", "n_qubits"]
+    if isinstance(key, (tuple, list)):
+        return list(key)
+    return key.split(".")
+
+
+def build_key_tree(keys: Iterable) -> KeyNode:
+    root = KeyNode()
+    for key in keys:
+        node = root
+        for part in split_key(key):
+            node = node.children.setdefault(part, KeyNode())
+        node.labels.append(key)
+    return root
+
+
+def count_labels(node: KeyNode) -> int:
+    return len(node.labels) + sum(count_labels(c) for c in node.children.values())
+
+
+def skip_whitespace(buf, pos: int) -> int:
+    return WHITESPACE.match(buf, pos).end()
+
+
+def skip_string(buf, pos: int) -> int:
+    # pos is on the opening quote
+    end = pos + 1
+    while True:
+        end = buf.find(b'"', end)
+        if end == -1:
+            raise ValueError(f"unterminated string at byte {pos}")
+        n_backslashes = 0
+        while buf[end - 1 - n_backslashes] == BACKSLASH:
+            n_backslashes += 1
+        if n_backslashes % 2 == 0:
+            return end + 1
+        end += 1
+
+
+def skip_container(buf, pos: int) -> int:
+    # pos is on the opening bracket. find is much faster than a regex
+    # over a character class, so we keep the next position of each
+    # structural character and only look further once we passed it
+    next_pos = {c: buf.find(c, pos) for c in STRUCTURE}
+    depth = 0
+    while True:
+        candidates = [p for p in next_pos.values() if p != -1]
+        if not candidates:
+            raise ValueError("unexpected end of file")
+        pos = min(candidates)
+        c = buf[pos : pos + 1]
+        if c == b'"':
+            pos = skip_string(buf, pos)
+        else:
+            depth += 1 if c in OPENING else -1
+            pos += 1
+            if depth == 0:
+                return pos
+        for k, p in next_pos.items():
+            if p != -1 and p < pos:
+                next_pos[k] = buf.find(k, pos)
+
+
+def skip_value(buf, pos: int) -> int:
+    # returns the position right after the value starting at pos
+    c = buf[pos : pos + 1]
+    if c == b'"':
+        return skip_string(buf, pos)
+    if c in OPENING:
+        return skip_container(buf, pos)
+    m = SCALAR_END.search(buf, pos)
+    if m is None:
+        return len(buf)
+    return m.start()
+
+
+def get_path(obj: Any, path: list) -> Any:
+    for part in path:
+        obj = obj[part]
+    return obj
+
+
+class KeyScanner:
+    def __init__(self, buf, decoder: ExtendedJSONDecoder):
+        self.buf = buf
+        self.decoder = decoder
+        self.found = {}
+        self.n_missing = 0
+
+    def decode(self, start: int, end: int) -> Any:
+        return self.decoder.decode(bytes(self.buf[start:end]).decode("utf8"))
+
+    def capture(self, node: KeyNode, start: int, end: int):
+        value = self.decode(start, end)
+        # keys below this one are taken from the decoded value
+        stack = [(node, [])]
+        while stack:
+            n, sub_path = stack.pop()
+            for label in n.labels:
+                try:
+                    self.found[label] = get_path(value, sub_path)
+                    self.n_missing -= 1
+                except (KeyError, IndexError, TypeError):
+                    pass
+            for k, child in n.children.items():
+                stack.append((child, sub_path + [k]))
+
+    def scan(self, node: KeyNode) -> dict:
+        self.n_missing = count_labels(node)
+        pos = skip_whitespace(self.buf, 0)
+        if node.labels:
+            self.capture(node, pos, skip_value(self.buf, pos))
+        elif self.buf[pos : pos + 1] == b"{":
+            self.scan_object(node, pos)
+        return self.found
+
+    def scan_object(self, node: KeyNode, pos: int) -> int:
+        # pos is on the opening brace, returns the position after the closing one
+        # or -1 once everything was found, so that we stop reading
+        buf = self.buf
+        pos += 1
+        while True:
+            pos = skip_whitespace(buf, pos)
+            c = buf[pos : pos + 1]
+            if c == b"}":
+                return pos + 1
+            if c == b",":
+                pos += 1
+                continue
+            if c != b'"':
+                raise ValueError(f"expected a key at byte {pos}, got {c}")
+            key_end = skip_string(buf, pos)
+            key = self.decoder.decode(bytes(buf[pos:key_end]).decode("utf8"))
+            pos = skip_whitespace(buf, key_end)
+            if buf[pos : pos + 1] != b":":
+                raise ValueError(f"expected ':' at byte {pos}")
+            pos = skip_whitespace(buf, pos + 1)
+            child = node.children.get(key)
+            if child is None:
+                pos = skip_value(buf, pos)
+            elif child.labels:
+                end = skip_value(buf, pos)
+                self.capture(child, pos, end)
+                pos = end
+            elif buf[pos : pos + 1] == b"{":
+                pos = self.scan_object(child, pos)
+            else:
+                pos = skip_value(buf, pos)
+            if pos == -1 or self.n_missing == 0:
+                return -1
+
+
+def load_json_keys(fpath: os.PathLike, keys: Iterable, **decoder_kwargs) -> dict:
+    # keys are paths separated by dots: ["energies", "params.n_qubits"]
+    # returns {"energies": ..., "params.n_qubits": ...}
+    keys = list(keys)
+    decoder_kwargs.setdefault("dirname", os.path.dirname(fpath))
+    decoder = ExtendedJSONDecoder(**decoder_kwargs)
+    root = build_key_tree(keys)
+    compression = detect_compression(fpath)
+    if compression is not None:
+        with DECOMPRESSORS[compression](fpath, "rb") as fstream:
+            found = KeyScanner(fstream.read(), decoder).scan(root)
+    else:
+        with io.open(fpath, "rb") as fstream:
+            if os.fstat(fstream.fileno()).st_size == 0:
+                raise ValueError(f"{fpath} is empty")
+            with mmap.mmap(fstream.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                found = KeyScanner(buf, decoder).scan(root)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        raise KeyError(f"{missing} not found in {fpath}")
+    return {key: found[key] for key in keys}
@@ -0,0 +1,147 @@
+import functools
+import io
+import os
+import shutil
+import uuid
+from typing import Callable
+
+from data_manager.result_cache import canonical_hash
+from data_manager.utils import extended_dump, load_json_file, normalize_str
+
+# results of memoized functions, in <data folder>/__memo/<function>/<hash>/
+# with the value as extended json and the big arrays as .npy next to it.
+# the hash is over the arguments, arrays by content. an entry is written in a
+# temporary folder and renamed, so other processes never see half of one.
+# the least recently used entries (by mtime, touched on every hit) are
+# deleted when a function takes more than max_bytes
+
+MEMO_DIR = "__memo"
+VALUE_FILENAME = "value.json"
+MEMO_MAX_BYTES = 2**30
+# arrays bigger than this are .npy files, memory mapped when loaded
+MEMO_SIDECAR_THRESHOLD = 2**16
+
+
+def entry_size(dirname: os.PathLike) -> int:
+    size = 0
+    for root, _, filenames in os.walk(dirname):
+        for filename in filenames:
+            try:
+                size += os.path.getsize(os.path.join(root, filename))
+            except FileNotFoundError:
+                pass
+    return size
+
+
+def list_entries(dirname: os.PathLike) -> list:
+    # [(mtime, size, path)] of the entries of one function, oldest first
+    if not os.path.isdir(dirname):
+        return []
+    entries = []
+    for entry in os.scandir(dirname):
+        if entry.is_dir() and not entry.name.startswith("__"):
+            try:
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            entries.append((mtime, entry_size(entry.path), entry.path))
+    return sorted(entries)
+
+
+class MemoizedFunction:
+    def __init__(
+        self,
+        func: Callable,
+        data_folder: os.PathLike,
+        version: str = None,
+        max_bytes: int = MEMO_MAX_BYTES,
+    ):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.dirname = os.path.join(data_folder, MEMO_DIR, normalize_str(self.name))
+        self.version = version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, args: tuple, kwargs: dict) -> str:
+        try:
+            return canonical_hash(
+                {"func": self.name, "args": list(args), "kwargs": kwargs},
+                self.version,
+            )
+        except TypeError as e:
+            raise TypeError(f"can't hash the arguments of {self.name}: {e}") from e
+
+    def read(self, entry_dirname: os.PathLike):
+        fpath = os.path.join(entry_dirname, VALUE_FILENAME)
+        # copy on write so that the arrays can be modified
+        value = load_json_file(fpath, mmap_mode="c")["value"]
+        os.utime(entry_dirname)
+        return value
+
+    def write(self, entry_dirname: os.PathLike, value):
+        tmp_dirname = os.path.join(self.dirname, f"__{uuid.uuid4().hex}")
+        os.makedirs(tmp_dirname)
+        try:
+            with io.open(
+                os.path.join(tmp_dirname, VALUE_FILENAME), "w", encoding="utf8"
+            ) as fstream:
+                extended_dump(
+                    {"value": value},
+                    fstream,
+                    sidecar_dirname=tmp_dirname,
+                    sidecar_stem="value",
+                    sidecar_threshold=MEMO_SIDECAR_THRESHOLD,
+                    ndarray_format="base64",
+                )
+            os.rename(tmp_dirname, entry_dirname)
+        except OSError:
+            # someone else stored it first
+            if not os.path.isdir(entry_dirname):
+                raise
+        finally:
+            shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+    def __call__(self, *args, **kwargs):
+        entry_dirname = os.path.join(self.dirname, self.key(args, kwargs))
+        if os.path.isdir(entry_dirname):
+            try:
+                value = self.read(entry_dirname)
+                self.hits += 1
+                return value
+            except FileNotFoundError:
+                # evicted in the meantime
+                pass
+        self.misses += 1
+        value = self.func(*args, **kwargs)
+        self.write(entry_dirname, value)
+        self.evict()
+        return value
+
+    def evict(self):
+        entries = list_entries(self.dirname)
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def cache_info(self) -> dict:
+        entries = list_entries(self.dirname)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "n_entries": len(entries),
+            "n_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "dirname": self.dirname,
+        }
+
+    def cache_clear(self):
+        # for every process, the entries are deleted
+        shutil.rmtree(self.dirname, ignore_errors=True)
+        self.hits = 0
+        self.misses = 0
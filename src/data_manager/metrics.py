@@ -0,0 +1,148 @@
+import io
+import json
+import os
+import time
+
+import numpy as np
+
+from data_manager.atomic import atomic_path
+
+# scalars logged at every step go in one raw binary file per column,
+# which only ever gets appended to. columns.json says which columns there are
+# and their dtype. a column that shows up later is filled with nan for the
+# earlier steps, and so is a column that is missing from a step.
+# the files can be read while they are written: readers only keep the rows
+# that are complete in every column
+
+STEP_COLUMN = "step"
+COLUMNS_FILENAME = "columns.json"
+COLUMN_EXTENSION = ".bin"
+STEP_DTYPE = "<i8"
+VALUE_DTYPE = "<f8"
+# the buffer is written when it has this many rows or is this old
+FLUSH_ROWS = 1000
+FLUSH_SECONDS = 5.0
+
+
+def column_fpath(dirname: os.PathLike, name: str) -> str:
+    return os.path.join(dirname, name + COLUMN_EXTENSION)
+
+
+def read_columns(dirname: os.PathLike) -> dict:
+    fpath = os.path.join(dirname, COLUMNS_FILENAME)
+    if not os.path.isfile(fpath):
+        return {}
+    with io.open(fpath, "r", encoding="utf8") as fstream:
+        return json.load(fstream)
+
+
+def write_columns(dirname: os.PathLike, columns: dict):
+    # replaced in one go so that readers never see half of it
+    fpath = os.path.join(dirname, COLUMNS_FILENAME)
+    with atomic_path(fpath) as tmp_fpath:
+        with io.open(tmp_fpath, "w", encoding="utf8") as fstream:
+            json.dump(columns, fstream, indent=4)
+
+
+def count_rows(dirname: os.PathLike, columns: dict) -> int:
+    # the number of rows written in every column
+    n_rows = []
+    for name, dtype in columns.items():
+        fpath = column_fpath(dirname, name)
+        size = os.path.getsize(fpath) if os.path.isfile(fpath) else 0
+        n_rows.append(size // np.dtype(dtype).itemsize)
+    return min(n_rows, default=0)
+
+
+def load_metrics(dirname: os.PathLike) -> dict:
+    # {column: array}, all of the same length
+    columns = read_columns(dirname)
+    n_rows = count_rows(dirname, columns)
+    return {
+        name: np.fromfile(column_fpath(dirname, name), dtype=dtype, count=n_rows)
+        for name, dtype in columns.items()
+    }
+
+
+def latest_metrics(dirname: os.PathLike) -> dict:
+    # the last complete row, without reading the rest
+    columns = read_columns(dirname)
+    n_rows = count_rows(dirname, columns)
+    if n_rows == 0:
+        return {}
+    latest = {}
+    for name, dtype in columns.items():
+        dtype = np.dtype(dtype)
+        with io.open(column_fpath(dirname, name), "rb") as fstream:
+            fstream.seek((n_rows - 1) * dtype.itemsize)
+            latest[name] = np.frombuffer(fstream.read(dtype.itemsize), dtype)[0].item()
+    return latest
+
+
+class MetricsLogger:
+    def __init__(
+        self,
+        dirname: os.PathLike,
+        flush_rows: int = FLUSH_ROWS,
+        flush_seconds: float = FLUSH_SECONDS,
+    ):
+        self.dirname = dirname
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        # picks up after what is already there, e.g. a restored experiment
+        self.columns = read_columns(dirname)
+        self.n_written = count_rows(dirname, self.columns)
+        self.buffer = {name: [] for name in self.columns}
+        self.n_buffered = 0
+        self.last_flush = time.monotonic()
+
+    @property
+    def n_rows(self) -> int:
+        return self.n_written + self.n_buffered
+
+    def add_column(self, name: str):
+        if not name.isidentifier():
+            raise ValueError(f"metric names should be valid identifiers, got: {name}")
+        # the earlier rows are written first so that the new column
+        # only has to be backfilled on disk
+        self.flush()
+        os.makedirs(self.dirname, exist_ok=True)
+        dtype = STEP_DTYPE if name == STEP_COLUMN else VALUE_DTYPE
+        with io.open(column_fpath(self.dirname, name), "wb") as fstream:
+            fstream.write(np.full(self.n_written, np.nan, dtype=dtype).tobytes())
+        self.columns[name] = dtype
+        self.buffer[name] = []
+        write_columns(self.dirname, self.columns)
+
+    def log(self, step: int = None, **scalars):
+        if step is None:
+            step = self.n_rows
+        if STEP_COLUMN not in self.columns:
+            self.add_column(STEP_COLUMN)
+        for name in scalars:
+            if name not in self.columns:
+                self.add_column(name)
+        self.buffer[STEP_COLUMN].append(int(step))
+        for name, column in self.buffer.items():
+            if name != STEP_COLUMN:
+                column.append(float(scalars.get(name, np.nan)))
+        self.n_buffered += 1
+        if (
+            self.n_buffered >= self.flush_rows
+            or time.monotonic() - self.last_flush >= self.flush_seconds
+        ):
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.n_buffered:
+            return
+        # step goes last so that a reader never sees a step without its values
+        names = sorted(self.columns, key=lambda name: name == STEP_COLUMN)
+        for name in names:
+            data = np.asarray(self.buffer[name], dtype=self.columns[name])
+            with io.open(column_fpath(self.dirname, name), "ab") as fstream:
+                fstream.write(data.tobytes())
+            self.buffer[name].clear()
+        self.n_written += self.n_buffered
+        self.n_buffered = 0
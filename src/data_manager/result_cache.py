@@ -0,0 +1,98 @@
+import hashlib
+import io
+import json
+import os
+
+from data_manager.atomic import atomic_path
+from data_manager.json_extender import ExtendedJSONEncoder
+
+# runs are found by the hash of their inputs. the index lives in the data
+# folder as one small file per key, __cache_index/<first 2 chars>/<key>.json,
+# with the run folder (relative to the data folder) and the files saved in it.
+# entries of runs that were deleted are dropped when they are looked up,
+# or by prune_cache_index
+
+CACHE_INDEX_DIR = "__cache_index"
+
+
+def canonical_hash(jobj, version: str = None) -> str:
+    # the same parameters give the same hash, whatever the order of the keys.
+    # arrays are hashed from their bytes
+    jobj_str = json.dumps(
+        {"version": version, "params": jobj},
+        cls=ExtendedJSONEncoder,
+        ndarray_format="base64",
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(jobj_str.encode("utf8")).hexdigest()
+
+
+def index_fpath(data_folder: os.PathLike, key: str) -> str:
+    return os.path.join(data_folder, CACHE_INDEX_DIR, key[:2], key + ".json")
+
+
+def read_index_entry(data_folder: os.PathLike, key: str) -> dict:
+    fpath = index_fpath(data_folder, key)
+    if not os.path.isfile(fpath):
+        return None
+    with io.open(fpath, "r", encoding="utf8") as fstream:
+        return json.load(fstream)
+
+
+def write_index_entry(data_folder: os.PathLike, key: str, entry: dict):
+    fpath = index_fpath(data_folder, key)
+    os.makedirs(os.path.dirname(fpath), exist_ok=True)
+    with atomic_path(fpath) as tmp_fpath:
+        with io.open(tmp_fpath, "w", encoding="utf8") as fstream:
+            json.dump(entry, fstream, indent=4)
+
+
+def delete_index_entry(data_folder: os.PathLike, key: str):
+    try:
+        os.remove(index_fpath(data_folder, key))
+    except FileNotFoundError:
+        pass
+
+
+def add_to_index(
+    data_folder: os.PathLike, key: str, run_path: os.PathLike, filename: str
+):
+    # called by save_dict, for every file saved in a run that has a key
+    run_path = os.path.relpath(run_path, data_folder)
+    entry = read_index_entry(data_folder, key)
+    if entry is None or entry["run_path"] != run_path:
+        entry = {"run_path": run_path, "files": []}
+    if filename not in entry["files"]:
+        entry["files"].append(filename)
+    write_index_entry(data_folder, key, entry)
+
+
+def find_in_index(data_folder: os.PathLike, key: str) -> dict:
+    # the entry with absolute paths, or None if the run is gone
+    entry = read_index_entry(data_folder, key)
+    if entry is None:
+        return None
+    run_path = os.path.join(data_folder, entry["run_path"])
+    fpaths = [os.path.join(run_path, filename) for filename in entry["files"]]
+    if not fpaths or not all(os.path.isfile(fpath) for fpath in fpaths):
+        delete_index_entry(data_folder, key)
+        return None
+    return {"run_path": run_path, "fpaths": fpaths}
+
+
+def prune_cache_index(data_folder: os.PathLike) -> int:
+    # removes the entries of deleted runs, returns how many
+    index_dir = os.path.join(data_folder, CACHE_INDEX_DIR)
+    if not os.path.isdir(index_dir):
+        return 0
+    n_pruned = 0
+    for prefix in os.listdir(index_dir):
+        for filename in os.listdir(os.path.join(index_dir, prefix)):
+            key, extension = os.path.splitext(filename)
+            if extension != ".json":
+                continue
+            if find_in_index(data_folder, key) is None:
+                n_pruned += 1
+    return n_pruned
@@ -0,0 +1,39 @@
+import itertools
+from typing import Callable, Iterable, Union
+
+from data_manager.result_cache import canonical_hash
+
+# helpers for ExperimentDataManager.sweep. every point of the grid is a run,
+# the parameters are var_dumped with a key that identifies the point, so that
+# a sweep started again can tell which points are already done
+
+SWEEP_KEY = "__sweep_key"
+RESULT_FILENAME = "sweep_result"
+
+
+def expand_grid(grid: Union[dict, Iterable]) -> list:
+    # {"a": [1, 2], "b": [3, 4]} -> every combination, in order,
+    # a list of dicts is used as is
+    if isinstance(grid, dict):
+        names = list(grid.keys())
+        return [
+            dict(zip(names, values))
+            for values in itertools.product(*(grid[name] for name in names))
+        ]
+    return [dict(params) for params in grid]
+
+
+def sweep_key(func: Callable, params: dict) -> str:
+    # the same function with the same parameters gives the same key
+    return canonical_hash(
+        {"func": f"{func.__module__}.{func.__qualname__}", "params": params}
+    )
+
+
+def run_points(func: Callable, points: list) -> list:
+    # runs in the workers, one chunk of points at a time
+    return [func(**params) for params in points]
+
+
+def chunk_points(points: list, chunksize: int) -> list:
+    return [points[i : i + chunksize] for i in range(0, len(points), chunksize)]
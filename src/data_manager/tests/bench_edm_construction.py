@@ -0,0 +1,45 @@
+# how long it takes to make an ExperimentDataManager, with the logging files
+# written right away and deferred to the first save
+# usage: python bench_edm_construction.py [n_managers]
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from data_manager.data_manager import ExperimentDataManager
+
+
+def construct(data_folder: str, n_managers: int, defer_logging: bool) -> list:
+    durations = []
+    for _ in range(n_managers):
+        start = time.perf_counter()
+        edm = ExperimentDataManager(
+            data_folder=data_folder,
+            experiment_name="bench",
+            add_to_browser=False,
+            defer_logging=defer_logging,
+        )
+        durations.append(time.perf_counter() - start)
+        # write them now so that they don't pile up for exit
+        edm.flush()
+    return durations
+
+
+def main():
+    n_managers = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for defer_logging in (False, True):
+        with tempfile.TemporaryDirectory() as data_folder:
+            with redirect_stdout(open(os.devnull, "w")):
+                durations = construct(data_folder, n_managers, defer_logging)
+        durations = sorted(durations)
+        print(
+            f"defer_logging={defer_logging}: "
+            f"median {1e3 * durations[len(durations) // 2]:.2f}ms, "
+            f"mean {1e3 * sum(durations) / len(durations):.2f}ms "
+            f"over {n_managers} managers"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# compares the peak memory of writing a big nested list as one string
+# and streaming it with extended_dump, which is what save_dict does
+# usage: python bench_save_dict_memory.py [n_rows] [n_cols]
+import os
+import subprocess
+import sys
+import tempfile
+
+WRITER_CODE = """
+import io
+import resource
+import sys
+import time
+
+import numpy as np
+
+from data_manager.utils import WRITE_BUFFER_SIZE, extended_dump, extended_dumps
+
+method, fpath, n_rows, n_cols = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+jobj = {"payload": np.random.rand(n_rows, n_cols).tolist()}
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if method == "string":
+    jobj_str = extended_dumps(jobj)
+    with io.open(fpath, "w+", encoding="utf8") as fstream:
+        fstream.write(jobj_str)
+else:
+    with io.open(fpath, "w+", encoding="utf8", buffering=WRITE_BUFFER_SIZE) as fstream:
+        extended_dump(jobj, fstream)
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(baseline, peak, elapsed)
+"""
+
+
+def run(method: str, n_rows: int, n_cols: int):
+    with tempfile.TemporaryDirectory() as dirname:
+        fpath = os.path.join(dirname, "payload.json")
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                WRITER_CODE,
+                method,
+                fpath,
+                str(n_rows),
+                str(n_cols),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        size = os.path.getsize(fpath)
+    baseline, peak, elapsed = int(output[0]), int(output[1]), float(output[2])
+    # ru_maxrss is in kB on linux
+    print(
+        f"{method:>6}: file {size / 2**20:9.1f} MB, "
+        f"payload {baseline / 2**10:9.1f} MB, "
+        f"peak rss {peak / 2**10:9.1f} MB (+{(peak - baseline) / 2**10:.1f} MB), "
+        f"{elapsed:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_cols = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    for method in ("string", "stream"):
+        run(method, n_rows, n_cols)
@@ -0,0 +1,61 @@
+from data_manager.data_manager import ExperimentDataManager
+from data_manager.array_store import ChunkedArray, ChunkedArrayWriter
+import numpy as np
+import os
+import tempfile
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+edm = ExperimentDataManager(
+    data_folder=data_folder, experiment_name="test_array_store", add_to_browser=False
+)
+
+# one state per iteration
+states = np.random.rand(50, 8) + 1j * np.random.rand(50, 8)
+for state in states:
+    edm.append_array("states", state[None])
+# or a few at a time
+edm.append_array("states", states[:3])
+arr = edm.open_array("states")
+print(arr)
+assert arr.shape == (53, 8)
+assert np.array_equal(np.asarray(arr), np.concatenate([states, states[:3]]))
+# the data folder listing doesn't show the chunks
+assert "__chunked" not in edm.saved_dicts()
+
+# small chunks to go across them
+with tempfile.TemporaryDirectory() as dirname:
+    reference = np.arange(1000 * 6).reshape(1000, 2, 3).astype(float)
+    writer = ChunkedArrayWriter(dirname, chunk_bytes=7 * 6 * 8)
+    for start in range(0, 1000, 13):
+        writer.append(reference[start : start + 13])
+    arr = ChunkedArray(dirname)
+    assert len(arr.n_chunk_rows) == 143
+    for key in (
+        5,
+        -1,
+        slice(None),
+        slice(3, 500),
+        slice(6, 8),
+        slice(990, 2000),
+        slice(10, 0),
+        slice(None, None, -3),
+        [1, 999, 4],
+        (slice(20, 40), 1),
+        (7, 1, 2),
+        reference[:, 0, 0] % 2 == 0,
+    ):
+        assert np.array_equal(arr[key], reference[key]), key
+
+    # a half written row is ignored, and dropped when appending again
+    with open(os.path.join(dirname, "chunk_00142.bin"), "ab") as f:
+        f.write(b"\x00" * 8)
+    assert len(ChunkedArray(dirname)) == 1000
+    ChunkedArrayWriter(dirname).append(reference[:2])
+    arr = ChunkedArray(dirname)
+    assert np.array_equal(arr[-3:], reference[[-1, 0, 1]])
+
+    try:
+        writer.append(np.zeros((2, 3, 3)))
+        raise AssertionError("appended rows of the wrong shape")
+    except ValueError:
+        pass
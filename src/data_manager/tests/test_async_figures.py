@@ -0,0 +1,50 @@
+from data_manager.data_manager import ExperimentDataManager
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import os
+import time
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+
+
+def make_figure(seed: int) -> "plt.Figure":
+    rng = np.random.default_rng(seed)
+    fig, axes = plt.subplots(nrows=2)
+    for ax in axes:
+        for _ in range(20):
+            ax.plot(rng.random(5000))
+        ax.set_xlabel("x")
+    return fig
+
+
+if __name__ == "__main__":
+    n_figures = 8
+    durations = {}
+    for async_figures in (False, True):
+        edm = ExperimentDataManager(
+            data_folder=data_folder,
+            experiment_name="test_async_figures",
+            add_to_browser=False,
+            async_figures=async_figures,
+            figure_workers=4,
+        )
+        start = time.perf_counter()
+        for seed in range(n_figures):
+            fig = make_figure(seed)
+            edm.save_figure(fig, filename=f"fig_{seed}")
+            # the figure can go right away
+            plt.close(fig)
+        returned = time.perf_counter() - start
+        edm.flush()
+        durations[async_figures] = (returned, time.perf_counter() - start)
+        pdfs = [f for f in os.listdir(edm.current_fig_dir) if f.endswith(".pdf")]
+        assert len(pdfs) == n_figures
+        for pdf in pdfs:
+            with open(os.path.join(edm.current_fig_dir, pdf), "rb") as f:
+                assert f.read(4) == b"%PDF"
+    print(durations)
+    # save_figure returns before the rendering is done
+    assert durations[True][0] < durations[False][0]
@@ -0,0 +1,53 @@
+from data_manager.data_manager import ExperimentDataManager
+import numpy as np
+import os
+import time
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+edm = ExperimentDataManager(
+    data_folder=data_folder,
+    experiment_name="test_async_writes",
+    async_writes=True,
+    max_pending_writes=2,
+    add_to_browser=False,
+)
+
+array = np.zeros(100)
+for ind in range(10):
+    array[ind] = ind
+    edm.save_dict({"ind": ind, "array": array}, filename=f"step_{ind}")
+edm.flush()
+
+for ind in range(10):
+    # each save got its own copy of the array
+    jobj = edm.load_saved_dict(f"step_{ind}.json")
+    assert jobj["ind"] == ind
+    assert jobj["array"][: ind + 1].tolist() == list(range(ind + 1))
+    assert not jobj["array"][ind + 1 :].any()
+
+
+# errors come back on the next save or flush
+class NotSerializable:
+    pass
+
+
+edm.save_dict({"bad": NotSerializable()}, filename="bad")
+try:
+    edm.flush()
+    raise AssertionError("the write error should have been raised")
+except TypeError:
+    pass
+edm.flush()
+
+# a save after a failed write still gets written
+edm.save_dict({"bad": NotSerializable()}, filename="bad_again")
+while edm.writer.n_pending:
+    time.sleep(0.01)
+try:
+    edm.save_dict({"good": True}, filename="good")
+    raise AssertionError("the write error should have been raised")
+except TypeError:
+    pass
+edm.flush()
+assert edm.load_saved_dict("good.json")["good"]
+assert not os.path.exists(os.path.join(edm.current_data_dir, "bad_again.json"))
@@ -0,0 +1,65 @@
+from data_manager.data_manager import ExperimentDataManager
+from data_manager.checkpoints import read_checkpoint, write_checkpoint
+import numpy as np
+import os
+import tempfile
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+edm = ExperimentDataManager(
+    data_folder=data_folder, experiment_name="test_checkpoints", add_to_browser=False
+)
+
+state = {
+    "step": 10,
+    "params": np.random.rand(1000, 100),
+    "moments": [np.random.rand(300, 100), np.arange(5)],
+    "name": "adam",
+}
+edm.save_checkpoint(state)
+state["step"] = 20
+edm.save_checkpoint(state)
+checkpoint_dir = os.path.dirname(edm.checkpoint_dir("checkpoint"))
+# the previous one was replaced, nothing left behind
+assert os.listdir(checkpoint_dir) == ["checkpoint"]
+
+edm = ExperimentDataManager.load(edm.experiment_path)
+loaded = edm.load_checkpoint()
+assert loaded["step"] == 20
+assert loaded["name"] == "adam"
+assert np.array_equal(loaded["params"], state["params"])
+assert np.array_equal(loaded["moments"][0], state["moments"][0])
+assert np.array_equal(loaded["moments"][1], state["moments"][1])
+
+
+# the big arrays are mapped from the raw files
+def is_mapped(arr: np.ndarray) -> bool:
+    while arr is not None:
+        if isinstance(arr, np.memmap):
+            return True
+        arr = getattr(arr, "base", None)
+    return False
+
+
+assert is_mapped(loaded["params"])
+assert not is_mapped(loaded["moments"][1])
+# and can be modified without touching the checkpoint
+loaded["params"][0, 0] = -1
+assert edm.load_checkpoint()["params"][0, 0] == state["params"][0, 0]
+
+
+# a failed write leaves the previous checkpoint alone
+class Unpicklable:
+    def __reduce__(self):
+        raise RuntimeError("nope")
+
+
+with tempfile.TemporaryDirectory() as dirname:
+    fpath = os.path.join(dirname, "ckpt")
+    write_checkpoint({"a": np.ones(10**5)}, fpath)
+    try:
+        write_checkpoint({"a": np.zeros(10**5), "b": Unpicklable()}, fpath)
+        raise AssertionError("should have raised")
+    except RuntimeError:
+        pass
+    assert os.listdir(dirname) == ["ckpt"]
+    assert np.all(read_checkpoint(fpath)["a"] == 1)
@@ -0,0 +1,37 @@
+from data_manager.data_manager import ExperimentDataManager
+from data_manager.browser_builder import get_var_dump, load_json
+import numpy as np
+import os
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+data = {"energies": np.linspace(0, 1, 1000), "params": {"n_qubits": 4}}
+
+for compression in ("gzip", "bz2", "lzma"):
+    edm = ExperimentDataManager(
+        data_folder=data_folder,
+        experiment_name=f"test_compression_{compression}",
+        compression=compression,
+        compression_level=1,
+        add_to_browser=False,
+    )
+    edm.var_dump(compression=compression)
+    fpath = edm.save_dict(data, filename="compressed", return_fpath=True)
+    assert fpath.endswith(
+        ".json" + {"gzip": ".gz", "bz2": ".bz2", "lzma": ".xz"}[compression]
+    )
+
+    # all the loaders figure out the compression by themselves
+    for jobj in (
+        edm.load_saved_dict("compressed.json"),
+        edm.load_saved_dict(os.path.basename(fpath)),
+        edm.load_run_last_saved_data_file(),
+        load_json(fpath),
+    ):
+        assert np.array_equal(jobj["energies"], data["energies"])
+        assert jobj["params"] == data["params"]
+    assert edm.load_var_dump()["compression"] == compression
+    assert get_var_dump(edm.current_logging_dir)[0]["compression"] == compression
+
+    # the files needed to restore the experiment stay plain json
+    edm_restored = ExperimentDataManager.load(edm.experiment_path)
+    assert edm_restored.compression == compression
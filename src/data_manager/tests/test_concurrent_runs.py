@@ -0,0 +1,78 @@
+# starts a lot of processes at once with the same experiment name, they
+# should all get their own experiment, or their own run of a shared one
+import multiprocessing
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+from data_manager.data_manager import ExperimentDataManager
+
+N_PROCESSES = 48
+
+
+def worker(data_folder: str, shared_experiment: bool, barrier, results):
+    barrier.wait()
+    with redirect_stdout(open(os.devnull, "w")):
+        edm = ExperimentDataManager(
+            data_folder=data_folder,
+            experiment_name="crowded",
+            add_to_browser=False,
+            shared_experiment=shared_experiment,
+        )
+        edm.save_dict({"pid": os.getpid()}, filename="result")
+        edm.new_run()
+        edm.save_dict({"pid": os.getpid()}, filename="result")
+    results.put((edm.experiment_name, edm.run_number))
+
+
+def launch(data_folder: str, shared_experiment: bool) -> list:
+    barrier = multiprocessing.Barrier(N_PROCESSES)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=worker, args=(data_folder, shared_experiment, barrier, results)
+        )
+        for _ in range(N_PROCESSES)
+    ]
+    for process in processes:
+        process.start()
+    outputs = [results.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    return outputs
+
+
+def count_results(experiment_path: str) -> int:
+    n_results = 0
+    for run in os.listdir(experiment_path):
+        data_dir = os.path.join(experiment_path, run, "data")
+        if os.path.isdir(data_dir):
+            assert os.listdir(data_dir) == ["result.json"], os.listdir(data_dir)
+            n_results += 1
+    return n_results
+
+
+def main():
+    with tempfile.TemporaryDirectory() as data_folder:
+        outputs = launch(data_folder, shared_experiment=False)
+        names = {name for name, _ in outputs}
+        print(f"{len(names)} experiments for {N_PROCESSES} processes")
+        assert len(names) == N_PROCESSES
+        (date,) = os.listdir(data_folder)
+        for name in names:
+            assert count_results(os.path.join(data_folder, date, name)) == 2
+
+    with tempfile.TemporaryDirectory() as data_folder:
+        outputs = launch(data_folder, shared_experiment=True)
+        assert {name for name, _ in outputs} == {"crowded"}
+        runs = {run_number for _, run_number in outputs}
+        (date,) = os.listdir(data_folder)
+        n_results = count_results(os.path.join(data_folder, date, "crowded"))
+        print(f"{n_results} runs for {N_PROCESSES} processes with two runs each")
+        assert len(runs) == N_PROCESSES
+        assert n_results == 2 * N_PROCESSES
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from data_manager.data_manager import ExperimentDataManager
+from data_manager.utils import load_json_file
+import data_manager.constants as constants
+import os
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+edm = ExperimentDataManager(
+    data_folder=data_folder,
+    experiment_name="test_defer_logging",
+    add_to_browser=False,
+    defer_logging=True,
+)
+
+# the run folder is there, but nothing is written yet
+assert os.path.isdir(edm.current_saving_dirname)
+assert not os.path.exists(edm.current_logging_dir)
+browser_data_dir = os.path.join(edm.experiment_path, constants.BROWSER_FOLDER)
+assert not os.path.exists(browser_data_dir)
+
+# a second run before saving anything still gets its own files
+edm.new_run()
+edm.save_dict({"a": 1}, filename="first")
+
+for run_number in (0, 1):
+    logging_files = os.listdir(edm.logging_dir(run_number))
+    print(run_number, logging_files)
+    assert constants.MANIFEST_FILENAME + ".json" in logging_files
+    assert "test_defer_logging.py" in logging_files
+    restore = load_json_file(
+        os.path.join(edm.logging_dir(run_number), constants.RESTORE_FILENAME + ".json")
+    )
+    assert restore["run_number"] == run_number
+assert os.path.exists(
+    os.path.join(
+        browser_data_dir, constants.LOGGING_DIR, constants.MANIFEST_FILENAME + ".json"
+    )
+)
+
+# flush writes them too
+edm.new_run()
+assert not os.path.exists(edm.current_logging_dir)
+edm.flush()
+assert constants.RESTORE_FILENAME + ".json" in os.listdir(edm.current_logging_dir)
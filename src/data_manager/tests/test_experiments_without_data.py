@@ -0,0 +1,28 @@
+from data_manager.data_manager import ExperimentDataManager
+from data_manager.utils import get_experiments_without_data
+import numpy as np
+import tempfile
+
+with tempfile.TemporaryDirectory() as data_folder:
+
+    def make_experiment(experiment_name: str) -> ExperimentDataManager:
+        return ExperimentDataManager(
+            data_folder=data_folder,
+            experiment_name=experiment_name,
+            add_to_browser=False,
+        )
+
+    make_experiment("nothing")
+    edm = make_experiment("data")
+    edm.save_dict({"a": 1})
+    edm = make_experiment("metrics_only")
+    edm.log_metrics(step=0, loss=1.0)
+    edm.flush()
+    edm = make_experiment("checkpoint_only")
+    edm.save_checkpoint({"step": 3})
+    edm = make_experiment("array_only")
+    edm.append_array("states", np.zeros((2, 4)))
+
+    without_data = get_experiments_without_data(data_folder)
+    day = edm.experiment_date
+    assert without_data[day] == ["nothing"], without_data
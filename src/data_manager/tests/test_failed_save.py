@@ -0,0 +1,39 @@
+from data_manager.data_manager import ExperimentDataManager
+from data_manager.utils import load_json_file
+import numpy as np
+import os
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+
+# an object that can't be encoded doesn't leave a truncated file behind
+for compression in (None, "gzip"):
+    edm = ExperimentDataManager(
+        data_folder=data_folder,
+        experiment_name="test_failed_save",
+        add_to_browser=False,
+        compression=compression,
+        array_sidecar_threshold=2**10,
+    )
+    edm.save_dict({"a": 1}, filename="good")
+    try:
+        # fails after the array went out, halfway through the file
+        edm.save_dict({"arr": np.ones(2**12), "obj": object()}, filename="bad")
+        raise AssertionError("expected a TypeError")
+    except TypeError:
+        pass
+    files = os.listdir(edm.current_data_dir)
+    assert not any(f.startswith("bad") for f in files), files
+    assert not any(f.endswith(".tmp") for f in files), files
+    assert edm.load_run_last_saved_data_file()["a"] == 1
+
+    # overwriting keeps the old file when the new one fails
+    fpath = os.path.join(
+        edm.current_data_dir, "good.json" + (".gz" if compression else "")
+    )
+    assert load_json_file(fpath)["a"] == 1
+    try:
+        edm.write_json(fpath, {"obj": object()}, compression=compression)
+        raise AssertionError("expected a TypeError")
+    except TypeError:
+        pass
+    assert load_json_file(fpath)["a"] == 1
@@ -0,0 +1,155 @@
+from data_manager.data_manager import ExperimentDataManager
+from data_manager.figure_cache import figure_fingerprint, read_fingerprints
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.ticker import FuncFormatter
+import numpy as np
+import os
+import time
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+
+
+def make_figure(n_points: int = 100000, color: str = "C0"):
+    rng = np.random.default_rng(0)
+    fig, axes = plt.subplots(nrows=2, ncols=2)
+    for ax_ind, ax in enumerate(axes.ravel()):
+        for line_ind in range(4):
+            ax.plot(rng.random(n_points).cumsum(), color=color, label=f"{line_ind}")
+        ax.scatter(rng.random(1000), rng.random(1000))
+        ax.fill_between(np.arange(10), rng.random(10))
+        ax.set_xlabel(f"x {ax_ind}")
+        ax.set_title("energy")
+        ax.legend()
+    image = axes[1, 1].imshow(rng.random((10, 10)), extent=(0, n_points, 0, 10))
+    fig.colorbar(image, ax=axes[1, 1])
+    return fig
+
+
+def pdfs(edm: ExperimentDataManager) -> list:
+    return sorted(f for f in os.listdir(edm.current_fig_dir) if f.endswith(".pdf"))
+
+
+def main():
+    # the same figure made twice has the same fingerprint
+    fig_a, fig_b = make_figure(), make_figure()
+    assert figure_fingerprint(fig_a) == figure_fingerprint(fig_b)
+    assert figure_fingerprint(fig_a) != figure_fingerprint(fig_a, bbox_inches="tight")
+    assert figure_fingerprint(fig_a) != figure_fingerprint(make_figure(color="C1"))
+    fig_b.axes[0].lines[0].get_ydata()[-1] += 1
+    assert figure_fingerprint(fig_a) != figure_fingerprint(fig_b)
+    fig_b.axes[0].lines[0].get_ydata()[-1] -= 1
+    fig_b.axes[3].set_xlim(0, 10)
+    assert figure_fingerprint(fig_a) != figure_fingerprint(fig_b)
+    plt.close(fig_b)
+
+    edm = ExperimentDataManager(
+        data_folder=data_folder,
+        experiment_name="test_figure_dedupe",
+        add_to_browser=False,
+        dedupe_figures=True,
+    )
+    start = time.perf_counter()
+    edm.save_figure(fig_a, filename="energy")
+    render_duration = time.perf_counter() - start
+    start = time.perf_counter()
+    edm.save_figure(fig_a, filename="energy")
+    skip_duration = time.perf_counter() - start
+    print(f"rendered in {render_duration:.3f}s, skipped in {skip_duration:.3f}s")
+    assert pdfs(edm) == ["energy.pdf"]
+    assert skip_duration < render_duration / 5
+
+    # another name gets a hard link to the same file
+    edm.save_figure(fig_a, filename="energy_again")
+    assert pdfs(edm) == ["energy.pdf", "energy_again.pdf"]
+    assert os.path.samefile(
+        os.path.join(edm.current_fig_dir, "energy.pdf"),
+        os.path.join(edm.current_fig_dir, "energy_again.pdf"),
+    )
+
+    # a changed figure or a different shape is rendered again
+    fig_a.axes[1].set_title("another energy")
+    edm.save_figure(fig_a, filename="energy")
+    edm.save_figure(fig_a, filename="energy", fig_shape="half-y")
+    assert len(pdfs(edm)) == 4
+    fingerprints = read_fingerprints(edm.current_fig_dir)
+    assert len(fingerprints) == 3
+    assert sorted(entry["filename"] for entry in fingerprints.values()) == [
+        "energy.pdf",
+        "energy_00001.pdf",
+        "energy_00002.pdf",
+    ]
+
+    # a deleted figure is rendered again
+    os.remove(os.path.join(edm.current_fig_dir, "energy_00002.pdf"))
+    edm.save_figure(fig_a, filename="energy", fig_shape="half-y")
+    assert "energy_00003.pdf" in pdfs(edm)
+    plt.close(fig_a)
+
+    # the ticks and the grid count too
+    def make_small_figure():
+        fig, ax = plt.subplots()
+        ax.plot([0, 1, 2], [1, 3, 2])
+        ax.set_xticks([0, 1, 2])
+        return fig, ax
+
+    changes = (
+        lambda ax: ax.set_xticklabels(["a", "b", "c"]),
+        lambda ax: ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: f"{x}s")),
+        lambda ax: ax.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f"{x}m")),
+        lambda ax: ax.grid(True),
+        lambda ax: ax.tick_params(labelbottom=False),
+        lambda ax: ax.minorticks_on(),
+    )
+    fig, ax = make_small_figure()
+    fingerprint = figure_fingerprint(fig)
+    for change in changes:
+        fig, ax = make_small_figure()
+        change(ax)
+        assert figure_fingerprint(fig) != fingerprint
+        plt.close(fig)
+    fig, ax = make_small_figure()
+    edm.save_figure(fig, filename="ticks")
+    ax.set_xticklabels(["a", "b", "c"])
+    edm.save_figure(fig, filename="ticks")
+    ax.grid(True)
+    edm.save_figure(fig, filename="ticks_grid")
+    ticks_pdfs = [f for f in pdfs(edm) if f.startswith("ticks")]
+    assert len(ticks_pdfs) == 3, ticks_pdfs
+    for f in ticks_pdfs[1:]:
+        assert not os.path.samefile(
+            os.path.join(edm.current_fig_dir, ticks_pdfs[0]),
+            os.path.join(edm.current_fig_dir, f),
+        )
+    plt.close(fig)
+
+    # a new run has its own figures
+    edm.new_run()
+    fig = make_figure()
+    edm.save_figure(fig, filename="energy")
+    assert pdfs(edm) == ["energy.pdf"]
+    plt.close(fig)
+
+    # with async_figures, the figure being rendered is waited for
+    edm = ExperimentDataManager(
+        data_folder=data_folder,
+        experiment_name="test_figure_dedupe_async",
+        add_to_browser=False,
+        dedupe_figures=True,
+        async_figures=True,
+    )
+    fig = make_figure(n_points=1000)
+    edm.save_figure(fig, filename="energy")
+    edm.save_figure(fig, filename="energy_again")
+    edm.flush()
+    assert os.path.samefile(
+        os.path.join(edm.current_fig_dir, "energy.pdf"),
+        os.path.join(edm.current_fig_dir, "energy_again.pdf"),
+    )
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from data_manager.data_manager import ExperimentDataManager
+from data_manager.utils import load_figure_data, load_json_file, load_npz
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import os
+import tempfile
+import time
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+edm = ExperimentDataManager(
+    data_folder=data_folder, experiment_name="test_figure_npz", add_to_browser=False
+)
+
+# a dense figure with a few panels
+n_points = 100000
+rng = np.random.default_rng(0)
+fig, axes = plt.subplots(nrows=2, ncols=2)
+for ax_ind, ax in enumerate(axes.ravel()):
+    for line_ind in range(4):
+        ax.plot(rng.random(n_points).cumsum(), label=f"line {line_ind}")
+    ax.scatter(rng.random(1000), rng.random(1000), label="points")
+    ax.set_xlabel(f"x {ax_ind}")
+    ax.set_ylabel("energy")
+
+
+def fig_dir_size(stem: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(edm.current_fig_dir, f))
+        for f in os.listdir(edm.current_fig_dir)
+        if f.startswith(stem + "_data") or f.startswith(stem + "_arrays")
+    )
+
+
+results = {}
+for save_data in ("json", "npz", "npz_compressed"):
+    start = time.perf_counter()
+    edm.save_figure(fig, filename=save_data, save_data=save_data)
+    save_duration = time.perf_counter() - start
+    fpath = os.path.join(edm.current_fig_dir, f"{save_data}_data.json")
+    # reading the data, without plotting it
+    start = time.perf_counter()
+    fig_data = load_json_file(fpath)
+    if save_data != "json":
+        arrays = load_npz(os.path.join(edm.current_fig_dir, fig_data["arrays"]))
+        sum(arr.sum() for arr in arrays.values())
+    read_duration = time.perf_counter() - start
+    results[save_data] = (fig_dir_size(save_data), save_duration, read_duration)
+    loaded = load_figure_data(fpath)
+    loaded_axes = loaded.get_axes()
+    assert len(loaded_axes) == 4
+    assert loaded_axes[3].get_xlabel() == "x 3"
+    for line, original in zip(loaded_axes[2].lines, axes[1, 0].lines):
+        assert np.array_equal(line.get_xdata(), original.get_xdata())
+        assert np.array_equal(line.get_ydata(), original.get_ydata())
+    if save_data != "json":
+        assert np.array_equal(
+            loaded_axes[1].collections[0].get_offsets(),
+            axes[0, 1].collections[0].get_offsets(),
+        )
+    plt.close(loaded)
+
+# the save includes the pdf
+for save_data, (size, save_duration, read_duration) in results.items():
+    print(
+        f"{save_data}: {size / 2**20:.1f}MB, saved in {save_duration:.2f}s, "
+        f"data read in {read_duration:.3f}s"
+    )
+json_size, _, json_read = results["json"]
+assert json_size > 10 * results["npz"][0]
+assert json_size > 10 * results["npz_compressed"][0]
+# timings are noisy, only a loose bound
+assert json_read > results["npz"][2]
+assert json_read > results["npz_compressed"][2]
+
+# members stored without compression are memory mapped
+with tempfile.TemporaryDirectory() as dirname:
+    fpath = os.path.join(dirname, "arrays.npz")
+    arrays = {
+        "a": np.arange(10.0),
+        "b": np.ones((3, 4), order="F"),
+        "c": np.array([]),
+        "d": np.array(["x", "yy"]),
+    }
+    np.savez(fpath, **arrays)
+    loaded = load_npz(fpath)
+    assert isinstance(loaded["a"], np.memmap)
+    for k, v in arrays.items():
+        assert np.array_equal(loaded[k], v)
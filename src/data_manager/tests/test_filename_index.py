@@ -0,0 +1,47 @@
+from data_manager.data_manager import ExperimentDataManager
+import os
+import time
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+edm = ExperimentDataManager(
+    data_folder=data_folder,
+    experiment_name="test_filename_index",
+    add_timestamp=False,
+    add_to_browser=False,
+)
+
+# same name over and over gets numbered
+edm.save_dict({"a": 1}, filename="same")
+edm.save_dict({"a": 2}, filename="same")
+edm.save_dict({"a": 3}, filename="same.json")
+names = sorted(os.listdir(edm.current_data_dir))
+print(names)
+assert "same.json" in names
+assert "same_00001.json" in names
+assert "same_00002.json" in names
+
+# someone else writes the next name behind our back
+open(os.path.join(edm.current_data_dir, "same_00003.json"), "w").write("{}")
+edm.save_dict({"a": 4}, filename="same")
+assert os.path.exists(os.path.join(edm.current_data_dir, "same_00004.json"))
+assert edm.load_saved_dict("same_00004.json")["a"] == 4
+
+# allocation shouldn't depend on how many files are in the folder
+n_saves = 2000
+durations = []
+for _ in range(n_saves):
+    start = time.perf_counter()
+    fpath = edm.get_savepath(
+        dirname=edm.current_data_dir, filename="many", extension=".json"
+    )
+    durations.append(time.perf_counter() - start)
+    # the folder grows
+    open(fpath, "w").write("{}")
+n_files = len(os.listdir(edm.current_data_dir))
+assert n_files >= n_saves, n_files
+first, last = sum(durations[:500]), sum(durations[-500:])
+print(
+    f"{n_saves} names in {sum(durations):.3f}s, first 500 {first:.3f}s, last 500 {last:.3f}s"
+)
+assert sum(durations) < 1
+assert last < 5 * first + 0.05
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+
+# modules that should only be imported when they are actually used
+HEAVY_MODULES = (
+    "matplotlib",
+    "fitz",
+    "pymupdf",
+    "lxml",
+    "cirq",
+    "openfermion",
+    "sympy",
+    "qiskit",
+    "qiskit_ibm_runtime",
+)
+
+
+def imported_modules(statement: str) -> set:
+    # fresh interpreter, otherwise we only see what's already imported here
+    code = f"import sys\n{statement}\nprint('\\n'.join(sys.modules.keys()))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return {module.split(".")[0] for module in output.splitlines()}
+
+
+for statement in (
+    "import data_manager",
+    "from data_manager import ExperimentDataManager",
+    "from data_manager import ExtendedJSONEncoder, ExtendedJSONDecoder",
+):
+    loaded = imported_modules(statement).intersection(HEAVY_MODULES)
+    assert not loaded, f"{statement} imports {loaded}"
+
+assert "lxml" in imported_modules("from data_manager import rebuild_browser")
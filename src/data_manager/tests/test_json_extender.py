@@ -0,0 +1,128 @@
+from data_manager.json_extender import (
+    ExtendedJSONDecoder,
+    ExtendedJSONEncoder,
+    LazyValue,
+    materialize,
+    register_type,
+)
+import json
+import numpy as np
+
+
+def roundtrip(obj, **encoder_kwargs):
+    s = json.dumps(obj, cls=ExtendedJSONEncoder, **encoder_kwargs)
+    return json.loads(s, cls=ExtendedJSONDecoder)
+
+
+# packed arrays
+complex_array = np.random.rand(64, 64) + 1j * np.random.rand(64, 64)
+for arr in (
+    complex_array,
+    complex_array.T,
+    np.arange(12, dtype=">i4").reshape(3, 4),
+    np.array([True, False]),
+    np.zeros((0, 3)),
+):
+    out = roundtrip(arr, ndarray_format="base64")
+    assert out.dtype == arr.dtype and out.shape == arr.shape
+    assert np.array_equal(out, arr)
+
+# non numeric arrays fall back to lists
+assert list(roundtrip(np.array(["a", "b"]), ndarray_format="base64")) == ["a", "b"]
+
+# same settings as save_dict
+packed = json.dumps(
+    complex_array, indent=4, cls=ExtendedJSONEncoder, ndarray_format="base64"
+)
+listed = json.dumps(complex_array, indent=4, cls=ExtendedJSONEncoder)
+assert len(packed) * 5 < len(listed)
+
+
+# user types
+class Qubit:
+    def __init__(self, index: int):
+        self.index = index
+
+    def __to_json__(self):
+        return self.index
+
+    def __eq__(self, other):
+        return isinstance(other, Qubit) and other.index == self.index
+
+
+register_type(Qubit)
+assert roundtrip({"q": [Qubit(1), Qubit(2)]}) == {"q": [Qubit(1), Qubit(2)]}
+
+
+# not registered, saved as what __to_json__ gives
+class Point:
+    def __init__(self, x: float, y: float):
+        self.x, self.y = x, y
+
+    def __to_json__(self):
+        return {"x": self.x, "y": self.y}
+
+
+assert roundtrip({"p": Point(1, 2)}) == {"p": {"x": 1, "y": 2}}
+
+register_type(
+    frozenset, tag="frozenset", encoder=sorted, decoder=lambda x: frozenset(x)
+)
+assert roundtrip(frozenset([3, 1])) == frozenset([1, 3])
+
+
+# registering a base class after a subclass keeps the subclass's encoder,
+# and subclasses that were looked up before pick up the base's
+class Shape:
+    def __init__(self, size: int):
+        self.size = size
+
+
+class Square(Shape):
+    pass
+
+
+class Circle(Shape):
+    pass
+
+
+register_type(Square, encoder=lambda x: x.size, decoder=lambda x: ("square", x))
+try:
+    json.dumps(Circle(1), cls=ExtendedJSONEncoder)
+    raise AssertionError("expected a TypeError")
+except TypeError:
+    pass
+register_type(Shape, encoder=lambda x: x.size, decoder=lambda x: ("shape", x))
+assert roundtrip(Square(2)) == ("square", 2)
+assert roundtrip(Circle(3)) == ("shape", 3)
+
+
+# subclasses of the optional types defined elsewhere
+try:
+    import sympy
+except ImportError:
+    sympy = None
+if sympy is not None:
+
+    class MySym(sympy.Symbol):
+        pass
+
+    s = json.dumps({"e": MySym("x")}, cls=ExtendedJSONEncoder)
+    assert json.loads(s)["e"] == {"type": "MySym", "args": "x"}
+    assert roundtrip(sympy.Symbol("y")) == sympy.Symbol("y")
+
+
+# lazy decoding
+s = json.dumps({"array": complex_array, "c": 1j}, cls=ExtendedJSONEncoder)
+lazy = json.loads(s, cls=ExtendedJSONDecoder, lazy=True)
+assert isinstance(lazy["array"], LazyValue) and lazy["c"] == 1j
+assert not lazy["array"].is_materialized
+assert lazy["array"].shape == complex_array.shape
+assert np.array_equal(lazy["array"] * 2, complex_array * 2)
+assert lazy["array"].materialize() is lazy["array"].materialize()
+# saving it again gives the same file
+assert json.dumps(lazy, cls=ExtendedJSONEncoder) == s
+assert np.array_equal(
+    materialize(json.loads(s, cls=ExtendedJSONDecoder, lazy=True))["array"],
+    complex_array,
+)
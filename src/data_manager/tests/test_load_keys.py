@@ -0,0 +1,34 @@
+from data_manager.data_manager import ExperimentDataManager
+import numpy as np
+import os
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+data = {
+    "big": np.random.rand(200, 200).tolist(),
+    'tricky "key"': {"s": 'braces }] and "quotes" \\', "l": [[], {}]},
+    "energies": np.linspace(0, 1, 10),
+    "params": {"n_qubits": 4, "names": ["a", "b"]},
+}
+
+for compression in (None, "gzip"):
+    edm = ExperimentDataManager(
+        data_folder=data_folder,
+        experiment_name="test_load_keys",
+        compression=compression,
+        add_to_browser=False,
+    )
+    fpath = edm.save_dict(data, filename="keys", return_fpath=True)
+    jobj = edm.load_saved_dict(
+        "keys.json", keys=["energies", "params.n_qubits", 'tricky "key".s']
+    )
+    assert list(jobj.keys()) == ["energies", "params.n_qubits", 'tricky "key".s']
+    assert np.array_equal(jobj["energies"], data["energies"])
+    assert jobj["params.n_qubits"] == 4
+    assert jobj['tricky "key".s'] == data['tricky "key"']["s"]
+    assert edm.load_saved_dict("keys.json", keys=["params"])["params"] == data["params"]
+
+    try:
+        edm.load_saved_dict("keys.json", keys=["params.missing"])
+        raise AssertionError("missing keys should raise")
+    except KeyError:
+        pass
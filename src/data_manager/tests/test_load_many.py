@@ -0,0 +1,44 @@
+from data_manager.data_manager import ExperimentDataManager
+import numpy as np
+import os
+
+if __name__ == "__main__":
+    data_folder = os.path.dirname(__file__) + "/test_data_folder"
+    edm = ExperimentDataManager(
+        data_folder=data_folder,
+        experiment_name="test_load_many",
+        add_to_browser=False,
+        array_sidecar_threshold=1000,
+    )
+    for run in range(3):
+        if run > 0:
+            edm.new_run()
+        for ind in range(5):
+            edm.save_dict(
+                {"run": run, "ind": ind, "array": np.full(200, ind)},
+                filename=f"file_{ind}",
+            )
+
+    for executor in ("process", "thread"):
+        jobjs = edm.load_many(workers=3, executor=executor)
+        assert [jobj["ind"] for jobj in jobjs] == list(range(5))
+        assert np.array_equal(jobjs[2]["array"], np.full(200, 2))
+
+        runs = edm.load_many_runs(["file_4.json", "file_1.json"], executor=executor)
+        assert list(runs.keys()) == [0, 1, 2]
+        for run, jobjs in runs.items():
+            assert [(jobj["run"], jobj["ind"]) for jobj in jobjs] == [
+                (run, 4),
+                (run, 1),
+            ]
+
+    assert edm.load_many(["file_3.json"], run_number=1, workers=1)[0]["ind"] == 3
+
+    # threads by default, lazy values can't go through processes
+    jobjs = edm.load_many(workers=3, lazy=True)
+    assert np.array_equal(jobjs[4]["array"], np.full(200, 4))
+    try:
+        edm.load_many(workers=3, executor="process", lazy=True)
+        raise AssertionError("expected a ValueError")
+    except ValueError:
+        pass
@@ -0,0 +1,68 @@
+from data_manager.data_manager import ExperimentDataManager
+import multiprocessing
+import numpy as np
+import tempfile
+
+N_CALLS = multiprocessing.Value("i", 0)
+
+
+def hamiltonian(n_qubits: int, field: np.ndarray) -> np.ndarray:
+    with N_CALLS.get_lock():
+        N_CALLS.value += 1
+    return np.diag(np.arange(2**n_qubits)) * field.sum()
+
+
+def small_hamiltonian(n_qubits: int, field: np.ndarray) -> np.ndarray:
+    return hamiltonian(n_qubits, field)
+
+
+def call_in_other_process(data_folder: str, field: np.ndarray):
+    edm = ExperimentDataManager(data_folder=data_folder, dry_run=True)
+    return edm.memoize(hamiltonian)(4, field=field)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as data_folder:
+        edm = ExperimentDataManager(data_folder=data_folder, dry_run=True)
+        memo_hamiltonian = edm.memoize(hamiltonian)
+        field = np.ones(3)
+
+        h = memo_hamiltonian(4, field=field)
+        assert np.array_equal(memo_hamiltonian(4, field=field), h)
+        # same content, different array
+        assert np.array_equal(memo_hamiltonian(4, field=np.ones(3)), h)
+        assert N_CALLS.value == 1
+        memo_hamiltonian(4, field=2 * field)
+        assert N_CALLS.value == 2
+        info = memo_hamiltonian.cache_info()
+        print(info)
+        assert (info["hits"], info["misses"], info["n_entries"]) == (2, 2, 2)
+
+        # another process finds it too
+        with multiprocessing.Pool(2) as pool:
+            results = pool.starmap(call_in_other_process, [(data_folder, field)] * 2)
+        assert N_CALLS.value == 2
+        assert np.array_equal(results[0], h)
+
+        # big results are kept out of the json and can still be modified
+        h = memo_hamiltonian(10, field=field)
+        h[0, 0] = -1
+        assert memo_hamiltonian(10, field=field)[0, 0] == 0
+
+        # least recently used entries go first
+        max_bytes = 180 * 2**10
+        small = edm.memoize(small_hamiltonian, max_bytes=max_bytes)
+        for n_qubits in (6, 7, 6):
+            small(n_qubits, field=field)
+        n_calls = N_CALLS.value
+        small(5, field=field)
+        info = small.cache_info()
+        print(info)
+        assert info["n_bytes"] <= max_bytes
+        small(6, field=field)
+        assert N_CALLS.value == n_calls + 1
+        small(7, field=field)
+        assert N_CALLS.value == n_calls + 2
+
+        small.cache_clear()
+        assert small.cache_info()["n_entries"] == 0
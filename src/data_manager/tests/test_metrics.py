@@ -0,0 +1,53 @@
+from data_manager.data_manager import ExperimentDataManager
+from data_manager.metrics import MetricsLogger, latest_metrics, load_metrics
+from data_manager.browser_builder import populate_run
+from lxml.html import tostring
+import numpy as np
+import os
+import tempfile
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+edm = ExperimentDataManager(
+    data_folder=data_folder, experiment_name="test_metrics", add_to_browser=False
+)
+
+n_steps = 5000
+for step in range(n_steps):
+    metrics = {"loss": 1 / (step + 1)}
+    # shows up halfway, and only every other step
+    if step >= n_steps // 2 and step % 2 == 0:
+        metrics["energy"] = -step
+    edm.log_metrics(step=step, **metrics)
+
+metrics = edm.load_metrics()
+print({k: v[-3:] for k, v in metrics.items()})
+assert np.array_equal(metrics["step"], np.arange(n_steps))
+assert np.allclose(metrics["loss"], 1 / (np.arange(n_steps) + 1))
+assert np.all(np.isnan(metrics["energy"][: n_steps // 2]))
+assert np.all(np.isnan(metrics["energy"][n_steps // 2 + 1 :: 2]))
+assert metrics["energy"][-2] == -(n_steps - 2)
+
+latest = latest_metrics(edm.metrics_dir())
+print(latest)
+assert latest["step"] == n_steps - 1
+assert b"Metrics" in tostring(populate_run(edm.experiment_path, edm.current_run_dir))
+
+# a new run gets its own metrics
+edm.new_run()
+edm.log_metrics(loss=3)
+edm.log_metrics(loss=2)
+assert list(edm.load_metrics()["step"]) == [0, 1]
+assert len(edm.load_metrics(run_number=0)["step"]) == n_steps
+
+# readers only see complete rows while something is half written
+with tempfile.TemporaryDirectory() as dirname:
+    logger = MetricsLogger(dirname, flush_rows=1)
+    logger.log(a=1, b=2)
+    logger.log(a=3, b=4)
+    with open(os.path.join(dirname, "a.bin"), "ab") as f:
+        f.write(np.float64(5).tobytes())
+    with open(os.path.join(dirname, "b.bin"), "ab") as f:
+        f.write(b"\x00\x01")
+    metrics = load_metrics(dirname)
+    assert list(metrics["a"]) == [1, 3]
+    assert list(metrics["b"]) == [2, 4]
@@ -0,0 +1,51 @@
+from data_manager.data_manager import ExperimentDataManager
+from data_manager.utils import open_json_file
+import glob
+import io
+import os
+import sys
+import time
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+edm = ExperimentDataManager(
+    data_folder=data_folder,
+    experiment_name="test_print_redirect",
+    add_to_browser=False,
+    redirect_print_output=True,
+    print_log_max_bytes=2**16,
+    print_log_backups=100,
+    print_log_compression="gzip",
+)
+
+# all the arguments, like print
+print("a", 1, None, [2], sep="|", end="!\n")
+print("no newline", end="")
+print()
+print("to stderr", file=sys.stderr)
+edm.flush()
+log_fpath = os.path.join(edm.current_logging_dir, "print_output.log")
+with io.open(log_fpath, "r", encoding="utf8") as f:
+    lines = f.read().splitlines()
+assert "a|1|None|[2]!" in lines
+assert "no newline" in lines
+assert "to stderr" not in lines
+
+n_lines = 20000
+start = time.perf_counter()
+for i in range(n_lines):
+    print("line", i)
+duration = time.perf_counter() - start
+edm.flush()
+sys.stderr.write(f"{n_lines} prints in {duration:.3f}s\n")
+
+# rotated into compressed files, nothing lost
+rotated = sorted(glob.glob(log_fpath + ".*.gz"), key=lambda f: -int(f.split(".")[-2]))
+assert len(rotated) > 1
+text = ""
+for fpath in rotated:
+    with open_json_file(fpath, "r") as f:
+        text += f.read()
+with io.open(log_fpath, "r", encoding="utf8") as f:
+    text += f.read()
+printed = [line for line in text.splitlines() if line.startswith("line ")]
+assert printed == [f"line {i}" for i in range(n_lines)]
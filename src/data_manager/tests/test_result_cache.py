@@ -0,0 +1,54 @@
+from data_manager.data_manager import ExperimentDataManager
+from data_manager.result_cache import (
+    canonical_hash,
+    find_in_index,
+    index_fpath,
+    prune_cache_index,
+)
+import numpy as np
+import os
+import shutil
+import tempfile
+
+assert canonical_hash({"a": 1, "b": [1, 2]}) == canonical_hash({"b": [1, 2], "a": 1})
+assert canonical_hash({"a": 1}) != canonical_hash({"a": 1}, version="v2")
+assert canonical_hash({"x": np.arange(3)}) != canonical_hash({"x": np.arange(3.0)})
+
+with tempfile.TemporaryDirectory() as data_folder:
+    params = {"n_qubits": 4, "angles": np.linspace(0, 1, 5), "ansatz": "hva"}
+
+    edm = ExperimentDataManager(
+        data_folder=data_folder, experiment_name="first", add_to_browser=False
+    )
+    assert edm.cached_result(params, version="v1") is None
+    edm.save_dict({"energy": -3.2}, filename="result")
+    edm.save_dict({"state": np.ones(4)}, filename="state")
+    # logging files aren't part of it
+    edm.var_dump(**params)
+
+    # another experiment with the same params gets the saved data
+    for async_writes in (False, True):
+        other = ExperimentDataManager(
+            data_folder=data_folder,
+            experiment_name="second",
+            add_to_browser=False,
+            async_writes=async_writes,
+        )
+        cached = other.cached_result(dict(reversed(params.items())), version="v1")
+        assert sorted(cached.keys()) == ["result", "state"]
+        assert cached["result"]["energy"] == -3.2
+        assert np.array_equal(cached["state"]["state"], np.ones(4))
+    assert other.cached_result(params, version="v2") is None
+    other.save_dict({"energy": -3.3}, filename="result")
+    other.flush()
+    key = canonical_hash(params, version="v2")
+    assert os.path.isfile(index_fpath(data_folder, key))
+
+    # deleting the run drops its entry
+    shutil.rmtree(edm.experiment_path)
+    assert edm.cached_result(params, version="v1") is None
+    assert not os.path.isfile(index_fpath(data_folder, canonical_hash(params, "v1")))
+    # or all at once
+    shutil.rmtree(other.experiment_path)
+    assert prune_cache_index(data_folder) == 1
+    assert find_in_index(data_folder, key) is None
@@ -0,0 +1,37 @@
+from data_manager.utils import (
+    name_builder,
+    random_word_from_list,
+    read_cached,
+    read_config,
+    read_data_path,
+    get_settings,
+)
+import os
+import tempfile
+import time
+
+# settings are parsed once
+assert get_settings() is get_settings()
+print(read_data_path())
+
+# and again when the file changes
+with tempfile.TemporaryDirectory() as dirname:
+    fpath = os.path.join(dirname, "settings.ini")
+    with open(fpath, "w") as f:
+        f.write("[paths]\ndata_path = a\n")
+    assert read_cached(fpath, read_config)["paths"]["data_path"] == "a"
+    with open(fpath, "w") as f:
+        f.write("[paths]\ndata_path = bb\n")
+    assert read_cached(fpath, read_config)["paths"]["data_path"] == "bb"
+
+    fpath = os.path.join(dirname, "words.txt")
+    with open(fpath, "w") as f:
+        f.write("one\ntwo\nthree\n")
+    words = random_word_from_list(fpath, size=100)
+    assert len(words) == 100
+    assert set(words) <= {"one", "two", "three"}
+
+n_names = 10000
+start = time.perf_counter()
+names = [name_builder(["scientists.txt", "ge_villes.txt"]) for _ in range(n_names)]
+print(f"{n_names} names in {time.perf_counter() - start:.3f}s, e.g. {names[0]}")
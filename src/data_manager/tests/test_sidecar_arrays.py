@@ -0,0 +1,30 @@
+from data_manager.data_manager import ExperimentDataManager
+import numpy as np
+import os
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+edm = ExperimentDataManager(
+    data_folder=data_folder,
+    experiment_name="test_sidecar_arrays",
+    array_sidecar_threshold=1024,
+    add_to_browser=False,
+)
+
+big_array = np.random.rand(256, 256)
+small_array = np.arange(10)
+
+fpath = edm.save_dict(
+    {"big": big_array, "small": small_array, "nested": {"big": big_array.T}},
+    filename="arrays",
+    return_fpath=True,
+)
+
+jobj = edm.load_saved_dict(os.path.basename(fpath))
+
+# big arrays come back memory mapped, small ones are inline
+assert isinstance(jobj["big"], np.memmap)
+assert np.array_equal(jobj["big"], big_array)
+assert np.array_equal(jobj["nested"]["big"], big_array.T)
+assert not isinstance(jobj["small"], np.memmap)
+assert np.array_equal(jobj["small"], small_array)
+assert edm.saved_dicts() == [os.path.basename(fpath)]
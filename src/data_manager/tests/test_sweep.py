@@ -0,0 +1,74 @@
+from data_manager.data_manager import ExperimentDataManager
+import numpy as np
+import os
+import time
+
+data_folder = os.path.dirname(__file__) + "/test_data_folder"
+
+
+def energy(n_qubits: int, depth: int) -> dict:
+    return {"energy": -n_qubits * depth, "state": np.ones(n_qubits)}
+
+
+def flaky(x: int) -> int:
+    if x == 3:
+        raise ValueError("bad point")
+    return x**2
+
+
+def sleepy(x: float) -> float:
+    time.sleep(x)
+    return x
+
+
+if __name__ == "__main__":
+    edm = ExperimentDataManager(
+        data_folder=data_folder, experiment_name="test_sweep", add_to_browser=False
+    )
+    grid = {"n_qubits": [2, 4, 6], "depth": [1, 2]}
+
+    # half of it, as if it crashed
+    results = edm.sweep(energy, [{"n_qubits": 2, "depth": 1}], workers=2)
+    assert results[0]["energy"] == -2
+    n_runs = len(edm.existing_run_numbers())
+
+    # picking up the same experiment only runs what is missing
+    edm = ExperimentDataManager(
+        data_folder=data_folder,
+        experiment_name=edm.experiment_name,
+        overwrite_experiment=True,
+        add_to_browser=False,
+    )
+    results = edm.sweep(energy, grid, workers=2, chunksize=2)
+    assert [r["energy"] for r in results] == [-2, -4, -4, -8, -6, -12]
+    assert np.array_equal(results[2]["state"], np.ones(4))
+    # one more run for the new manager, and one per missing point
+    assert len(edm.existing_run_numbers()) == n_runs + 1 + 5
+    # the points get their runs as they finish, in any order
+    dumps = [edm.load_var_dump(run) for run in edm.existing_run_numbers()]
+    points = sorted((d["n_qubits"], d["depth"]) for d in dumps if "n_qubits" in d)
+    assert points == [(2, 1), (2, 2), (4, 1), (4, 2), (6, 1), (6, 2)], points
+
+    # nothing left to do
+    loaded = edm.sweep(energy, grid)
+    assert [r["energy"] for r in loaded] == [r["energy"] for r in results]
+    assert np.array_equal(loaded[2]["state"], results[2]["state"])
+    assert len(edm.existing_run_numbers()) == n_runs + 1 + 5
+
+    # a failed point doesn't stop the others, and can be resumed
+    try:
+        edm.sweep(flaky, {"x": range(6)}, workers=3)
+        raise AssertionError("should have raised")
+    except RuntimeError as e:
+        print(e)
+    done = edm.done_sweep_points()
+    assert len(done) == 6 + 5
+    results = edm.sweep(flaky, [{"x": x} for x in (0, 1, 2, 4, 5)], workers=1)
+    assert results == [0, 1, 4, 16, 25]
+
+    # runs in parallel
+    start = time.perf_counter()
+    edm.sweep(sleepy, {"x": [0.5] * 4}, workers=4, resume=False)
+    duration = time.perf_counter() - start
+    print(f"4 points of 0.5s in {duration:.2f}s")
+    assert duration < 1.5
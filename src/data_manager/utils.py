@@ -1,21 +1,42 @@
+import bz2
 import configparser
+import gzip
+import hashlib
 import io
 import json
+import lzma
 import os
 import re
+import struct
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 
 import __main__
-import matplotlib.pyplot as plt
 import numpy as np
 import data_manager.constants as constants
 from data_manager.json_extender import ExtendedJSONDecoder, ExtendedJSONEncoder
 import shutil
-from typing import Iterable
+from typing import Callable, Iterable, Literal, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
 
 DELETE_DAY_COMMAND = "__DELETE_DAY"
+# the encoder yields lots of tiny strings, buffer them before hitting the disk
+WRITE_BUFFER_SIZE = 2**20
+WRITE_N_CHUNKS = 2**12
+# compressed json files, from the stdlib
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "bz2": ".bz2", "lzma": ".xz"}
+DEFAULT_COMPRESSION_LEVELS = {"gzip": 6, "bz2": 9, "lzma": 6}
+COMPRESSION_MAGIC = {b"\x1f\x8b": "gzip", b"BZh": "bz2", b"\xfd7zXZ\x00": "lzma"}
+# save_figure(save_data="npz"), the json only describes the figure
+FIGURE_ARRAYS_FORMAT = "npz"
 HOME = os.path.dirname(__file__)
 BROWSER_DATA_PATH = os.path.join(HOME, "browser")
+# (fpath, reader) -> ((mtime, size), value), see read_cached
+FILE_CACHE = {}
 
 
 def setup_browser_folder():
@@ -48,9 +69,7 @@ def init_settings(
 def get_most_recent_timestamped_files(files: list):
     timestamps = []
     for f in files:
-        jobj = json.loads(
-            io.open(f, "r", encoding="utf8").read(), cls=ExtendedJSONDecoder
-        )
+        jobj = load_json_file(f)
         if constants.TIMESTAMP_KEY in jobj.keys():
             timestamps.append(jobj[constants.TIMESTAMP_KEY])
         else:
@@ -73,8 +92,188 @@ def normalize_str(s: str):
     return re.sub("[^A-Za-z0-9_]+", "", s2)
 
 
-def extended_dumps(jobj: dict) -> str:
-    return json.dumps(jobj, indent=4, ensure_ascii=False, cls=ExtendedJSONEncoder)
+def extended_dumps(jobj: dict, **encoder_kwargs) -> str:
+    return json.dumps(
+        jobj, indent=4, ensure_ascii=False, cls=ExtendedJSONEncoder, **encoder_kwargs
+    )
+
+
+def extended_dump(jobj: dict, fstream: io.TextIOBase, **encoder_kwargs):
+    # writes the chunks as they are encoded instead of building the whole string
+    # joining a few thousand of them first is faster than writing them one by one
+    encoder = ExtendedJSONEncoder(indent=4, ensure_ascii=False, **encoder_kwargs)
+    chunks = []
+    for chunk in encoder.iterencode(jobj):
+        chunks.append(chunk)
+        if len(chunks) >= WRITE_N_CHUNKS:
+            fstream.write("".join(chunks))
+            chunks.clear()
+    fstream.write("".join(chunks))
+
+
+def detect_compression(fpath: os.PathLike) -> str:
+    # look at the first bytes rather than trusting the extension
+    with io.open(fpath, "rb") as fstream:
+        magic = fstream.read(6)
+    for k, v in COMPRESSION_MAGIC.items():
+        if magic.startswith(k):
+            return v
+    return None
+
+
+def open_json_file(
+    fpath: os.PathLike,
+    mode: str = "r",
+    compression: str = None,
+    compression_level: int = None,
+) -> io.TextIOBase:
+    # when reading, the compression is detected from the file itself
+    if mode.startswith("r"):
+        compression = detect_compression(fpath)
+    if compression is None:
+        return io.open(fpath, mode, encoding="utf8", buffering=WRITE_BUFFER_SIZE)
+    if compression not in COMPRESSION_EXTENSIONS.keys():
+        raise ValueError(
+            f"expected compression to be one of {list(COMPRESSION_EXTENSIONS.keys())}, got: {compression}"
+        )
+    mode = mode.replace("+", "") + "t"
+    if compression_level is None:
+        compression_level = DEFAULT_COMPRESSION_LEVELS[compression]
+    if compression == "gzip":
+        return gzip.open(fpath, mode, compresslevel=compression_level, encoding="utf8")
+    elif compression == "bz2":
+        return bz2.open(fpath, mode, compresslevel=compression_level, encoding="utf8")
+    elif compression == "lzma":
+        # the preset is only allowed when writing
+        if mode.startswith("r"):
+            compression_level = None
+        return lzma.open(fpath, mode, preset=compression_level, encoding="utf8")
+
+
+def resolve_json_fpath(fpath: os.PathLike) -> os.PathLike:
+    # foo.json might have been saved as foo.json.gz
+    if not os.path.isfile(fpath):
+        for extension in COMPRESSION_EXTENSIONS.values():
+            if os.path.isfile(str(fpath) + extension):
+                return str(fpath) + extension
+    return fpath
+
+
+def load_json_file(fpath: os.PathLike, **decoder_kwargs):
+    # sidecar files are stored relative to the json file
+    decoder_kwargs.setdefault("dirname", os.path.dirname(fpath))
+    with open_json_file(fpath, "r") as fstream:
+        return json.load(fstream, cls=ExtendedJSONDecoder, **decoder_kwargs)
+
+
+def load_json_files(
+    fpaths: list,
+    workers: int = None,
+    executor: Literal["process", "thread"] = "thread",
+    **decoder_kwargs,
+) -> list:
+    # threads by default, they are enough when the files are big arrays in
+    # sidecars or on a slow disk, and they work in scripts without an
+    # if __name__ == "__main__" guard. processes are faster for many small
+    # files (decoding is cpu bound), but the calling script gets imported
+    # again in every worker on spawn platforms (windows, macos).
+    # results are in the same order as fpaths
+    if executor == "process" and decoder_kwargs.get("lazy"):
+        # the lazy values would be read when they are pickled back
+        raise ValueError("lazy loading only works with executor='thread'")
+    fpaths = list(fpaths)
+    if workers is None:
+        workers = os.cpu_count()
+    load = partial(load_json_file, **decoder_kwargs)
+    if workers <= 1 or len(fpaths) <= 1:
+        return [load(fpath) for fpath in fpaths]
+    workers = min(workers, len(fpaths))
+    if executor == "process":
+        # a few chunks per worker so that slow files don't hold everyone back
+        chunksize = max(1, len(fpaths) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(load, fpaths, chunksize=chunksize))
+    elif executor == "thread":
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(load, fpaths))
+    raise ValueError(f"expected executor to be process or thread, got: {executor}")
+
+
+class FilenameIndex:
+    # names in use in each directory, listed once, so that finding a free
+    # name doesn't list and split the whole directory for every file.
+    # a directory is only listed again when a name that we thought was free
+    # exists on disk, i.e. someone else wrote there
+    def __init__(self):
+        # dirname -> stems (name up to the first dot)
+        self.stems = {}
+        # dirname -> number of entries, for the default file names
+        self.n_entries = {}
+        # (dirname, stem) -> next suffix to try
+        self.counters = {}
+
+    def scan(self, dirname: os.PathLike):
+        entries = os.listdir(dirname) if os.path.isdir(dirname) else []
+        self.stems[dirname] = {f.split(".")[0] for f in entries}
+        self.n_entries[dirname] = len(entries)
+
+    def get_stems(self, dirname: os.PathLike) -> set:
+        if dirname not in self.stems:
+            self.scan(dirname)
+        return self.stems[dirname]
+
+    def count(self, dirname: os.PathLike) -> int:
+        self.get_stems(dirname)
+        return self.n_entries[dirname]
+
+    def add(self, dirname: os.PathLike, filename: str):
+        stems = self.get_stems(dirname)
+        stem = filename.split(".")[0]
+        if stem not in stems:
+            stems.add(stem)
+            self.n_entries[dirname] += 1
+
+    def reserve(
+        self,
+        dirname: os.PathLike,
+        stem: str,
+        extension: str = "",
+        zero_padding_len: int = 5,
+    ) -> str:
+        # returns stem, or stem_0000n if taken, and marks it as used
+        stems = self.get_stems(dirname)
+        n = self.counters.get((dirname, stem), 1)
+        candidate = stem
+        while True:
+            if candidate not in stems:
+                if not os.path.exists(os.path.join(dirname, candidate + extension)):
+                    break
+                self.scan(dirname)
+                stems = self.stems[dirname]
+                continue
+            candidate = stem + "_" + f"{n:0{zero_padding_len}}"
+            n += 1
+        self.counters[(dirname, stem)] = n
+        self.add(dirname, candidate)
+        return candidate
+
+    def reserve_dir(
+        self, dirname: os.PathLike, stem: str, zero_padding_len: int = 5
+    ) -> str:
+        # like reserve, but also creates the folder. mkdir fails if it exists,
+        # so two processes can't end up with the same one
+        while True:
+            candidate = self.reserve(dirname, stem, zero_padding_len=zero_padding_len)
+            try:
+                os.mkdir(os.path.join(dirname, candidate))
+                return candidate
+            except FileExistsError:
+                pass
+
+
+def list_data_files(dirname: os.PathLike) -> list:
+    # skip the internal folders (sidecar arrays etc.)
+    return [f for f in os.listdir(dirname) if not f.startswith("__")]
 
 
 def home() -> str:
@@ -85,12 +284,39 @@ def wordlists_dir() -> str:
     return os.path.join(home(), "wordlists")
 
 
-def random_word_from_list(fpath):
-    lines = io.open(fpath, "r", encoding="utf8").read().splitlines()
-    return np.random.choice(lines)
+def read_cached(fpath: os.PathLike, reader: Callable):
+    # settings.ini and the wordlists are read for every name, path and
+    # thumbnail, so keep what reader made of the file until it changes on disk
+    stat = os.stat(fpath)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = FILE_CACHE.get((fpath, reader))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    value = reader(fpath)
+    FILE_CACHE[(fpath, reader)] = (version, value)
+    return value
+
+
+def read_wordlist(fpath: os.PathLike) -> np.ndarray:
+    with io.open(fpath, "r", encoding="utf8") as fstream:
+        return np.array(fstream.read().splitlines())
+
+
+def read_normalized_wordlist(fpath: os.PathLike) -> np.ndarray:
+    return np.array([normalize_str(w) for w in read_cached(fpath, read_wordlist)])
+
+
+def random_word_from_list(fpath, size: int = None):
+    # size=n gives an array of n words
+    return np.random.choice(read_cached(fpath, read_wordlist), size=size)
+
 
+def random_name_from_list(list_name: str, size: int = None):
+    fpath = os.path.join(wordlists_dir(), list_name)
+    return np.random.choice(read_cached(fpath, read_normalized_wordlist), size=size)
 
-def get_figure_dict(fig: plt.Figure):
+
+def get_figure_dict(fig: "plt.Figure"):
     fig_data = {}
     axes = fig.get_axes()
     fig_data["axes"] = {}
@@ -117,14 +343,123 @@ def get_figure_dict(fig: plt.Figure):
     return fig_data
 
 
-def load_figure_data(figure_fpath: os.PathLike):
-    jobj = json.loads(
-        io.open(figure_fpath, "r", encoding="utf8").read(),
-        cls=ExtendedJSONDecoder,
+def get_figure_arrays(fig: "plt.Figure") -> tuple:
+    # like get_figure_dict, but the data of the lines and scatter plots are
+    # returned as {name: array}, for one npz, and the dict has their names.
+    # arrays with the same content are kept once, and 0, 1, ..., n - 1 (the x
+    # of ax.plot(y)) is only written down as {"range": n}
+    from matplotlib.collections import PathCollection
+
+    fig_data = {"format": FIGURE_ARRAYS_FORMAT, "axes": {}}
+    arrays = {}
+    names = {}
+
+    def add_array(name: str, arr) -> str:
+        arr = np.ascontiguousarray(np.ma.getdata(arr))
+        if is_range(arr):
+            return {"range": arr.size, "dtype": arr.dtype.str}
+        digest = (
+            arr.dtype.str,
+            arr.shape,
+            hashlib.blake2b(arr.view(np.uint8).data if arr.size else b"").digest(),
+        )
+        if digest not in names:
+            names[digest] = name
+            arrays[name] = arr
+        return names[digest]
+
+    axes = fig.get_axes()
+    for ax_ind, ax in enumerate(axes):
+        ax_k = f"ax_{ax_ind}"
+        ax_data = {"lines": {}, "scatters": {}, "labels": {}}
+        for line_ind, line in enumerate(ax.lines):
+            line_k = f"line_{line_ind}"
+            ax_data["lines"][line_k] = {
+                "x_data": add_array(f"{ax_k}_{line_k}_x", line._x),
+                "y_data": add_array(f"{ax_k}_{line_k}_y", line._y),
+                "label": line.get_label(),
+            }
+        scatters = [c for c in ax.collections if isinstance(c, PathCollection)]
+        for scatter_ind, scatter in enumerate(scatters):
+            scatter_k = f"scatter_{scatter_ind}"
+            ax_data["scatters"][scatter_k] = {
+                "offsets": add_array(f"{ax_k}_{scatter_k}", scatter.get_offsets()),
+                "label": scatter.get_label(),
+            }
+        ax_data["labels"]["x_label"] = ax.xaxis.label.get_text()
+        ax_data["labels"]["y_label"] = ax.yaxis.label.get_text()
+        fig_data["axes"][ax_k] = ax_data
+    fig_data["creator"] = __main__.__file__
+    specs = axes[0].get_gridspec()
+    fig_data["specs"] = (specs.nrows, specs.ncols)
+    return fig_data, arrays
+
+
+def is_range(arr: np.ndarray) -> bool:
+    return (
+        arr.ndim == 1
+        and arr.size > 1
+        and arr.dtype.kind in "iuf"
+        and arr[0] == 0
+        and arr[-1] == arr.size - 1
+        and np.array_equal(arr, np.arange(arr.size))
     )
+
+
+def get_figure_array(arrays: dict, ref):
+    # ref is what get_figure_arrays put in the dict
+    if isinstance(ref, dict):
+        return np.arange(ref["range"], dtype=ref["dtype"])
+    return arrays[ref]
+
+
+def load_npz(fpath: os.PathLike, mmap_mode: str = "r") -> dict:
+    # np.load reads everything in a npz, the members that are stored without
+    # compression (np.savez) are memory mapped here instead
+    arrays = {}
+    with zipfile.ZipFile(fpath) as zfile, io.open(fpath, "rb") as fstream:
+        for info in zfile.infolist():
+            name = info.filename[: -len(".npy")]
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zfile.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+            # the local header is 30 bytes, then the name and the extra field
+            fstream.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", fstream.read(4))
+            fstream.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(fstream)
+            if version == (1, 0):
+                read_header = np.lib.format.read_array_header_1_0
+            else:
+                read_header = np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(fstream)
+            if dtype.hasobject or 0 in shape:
+                fstream.seek(info.header_offset + 30 + name_len + extra_len)
+                arrays[name] = np.lib.format.read_array(fstream)
+                continue
+            arrays[name] = np.memmap(
+                fpath,
+                dtype=dtype,
+                mode=mmap_mode,
+                offset=fstream.tell(),
+                shape=shape,
+                order="F" if fortran_order else "C",
+            )
+    return arrays
+
+
+def load_figure_data(figure_fpath: os.PathLike):
+    import matplotlib.pyplot as plt
+
+    jobj = load_json_file(figure_fpath)
     keys = list(jobj.keys())
+    # saved with save_data="npz", the data is in a npz next to it
+    arrays = None
+    if jobj.get("format") == FIGURE_ARRAYS_FORMAT:
+        arrays = load_npz(os.path.join(os.path.dirname(figure_fpath), jobj["arrays"]))
     if "axes" in keys:
-        axes_data = jobj["axes"]
+        axes_data = list(jobj["axes"].values())
     else:
         axes_data = [jobj[key] for key in keys if "ax" in key]
     if "specs" in keys:
@@ -133,6 +468,7 @@ def load_figure_data(figure_fpath: os.PathLike):
     else:
         n_subplots = sum([1 if "ax" in key else 0 for key in keys])
         fig, axes = plt.subplots(nrows=n_subplots, ncols=1)
+    axes = np.atleast_1d(axes).ravel()
 
     for ind, ax in enumerate(axes_data):
         if "labels" not in ax.keys():
@@ -149,16 +485,41 @@ def load_figure_data(figure_fpath: os.PathLike):
             label = None
             if "label" in lines[line_ind].keys():
                 label = lines[line_ind]["label"]
-            axes[ind].plot(
-                lines[line_ind]["x_data"],
-                lines[line_ind]["y_data"],
-                label=label,
-            )
+            x_data = lines[line_ind]["x_data"]
+            y_data = lines[line_ind]["y_data"]
+            if arrays is not None:
+                x_data = get_figure_array(arrays, x_data)
+                y_data = get_figure_array(arrays, y_data)
+            axes[ind].plot(x_data, y_data, label=label)
             axes[ind].set_xlabel(x_label)
             axes[ind].set_ylabel(y_label)
+        for scatter in ax.get("scatters", {}).values():
+            offsets = get_figure_array(arrays, scatter["offsets"])
+            axes[ind].scatter(offsets[:, 0], offsets[:, 1], label=scatter["label"])
     return fig
 
 
+def init_figure_worker():
+    # the workers only write files, no windows
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def render_figure(fig_pickle: bytes, figure_fpath: os.PathLike, **savefig_kwargs):
+    # runs in a worker process, with the figure pickled by save_figure
+    import pickle
+
+    import matplotlib.pyplot as plt
+
+    fig = pickle.loads(fig_pickle)
+    try:
+        fig.savefig(figure_fpath, **savefig_kwargs)
+    finally:
+        plt.close(fig)
+    return figure_fpath
+
+
 def get_time_of_day() -> str:
     if datetime.now().hour <= 8:
         return "early_morning"
@@ -179,9 +540,7 @@ def get_time_of_day() -> str:
 
 
 def name_from_list(list_name: str) -> str:
-    return normalize_str(
-        random_word_from_list(os.path.join(wordlists_dir(), list_name))
-    )
+    return str(random_name_from_list(list_name))
 
 
 def name_builder(wordlists: list, *args):
@@ -207,6 +566,16 @@ def get_all_experiment_paths() -> Iterable:
     return paths
 
 
+# a run that has one of these has produced something. the chunked arrays
+# of append_array are in the data folder
+RUN_OUTPUT_DIRS = (
+    constants.DATA_DIR,
+    constants.FIG_DIR,
+    constants.METRICS_DIR,
+    constants.CHECKPOINT_DIR,
+)
+
+
 def get_experiments_without_data(data_folder: str):
     experiments_without_data = {}
     days = os.listdir(data_folder)
@@ -222,7 +591,7 @@ def get_experiments_without_data(data_folder: str):
                     for _, dirnames, _ in os.walk(
                         os.path.join(data_folder, day, experiment)
                     ):
-                        if "data" in dirnames or "figures" in dirnames:
+                        if any(d in dirnames for d in RUN_OUTPUT_DIRS):
                             has_data = True
                             break
                     if not has_data:
@@ -276,18 +645,29 @@ def dirname_has_substring(dirname: str, substr: str, return_last: bool = True):
         raise ValueError(f"{substr} not in {dirname}")
 
 
+def read_config(fpath: os.PathLike) -> configparser.ConfigParser:
+    config = configparser.ConfigParser()
+    config.read(fpath)
+    return config
+
+
 def get_settings_file(filename: str):
     fpath = os.path.join(os.path.dirname(__file__), filename)
     if os.path.isfile(fpath):
-        config = configparser.ConfigParser()
-        config.read(os.path.join(os.path.dirname(__file__), filename))
-        return config
+        return read_config(fpath)
     else:
         raise FileNotFoundError(f"{filename} doesn't exist")
 
 
 def get_settings():
-    return get_settings_file(filename=constants.SETTINGS_FILENAME)
+    # shared between calls, don't modify it
+    fpath = os.path.join(os.path.dirname(__file__), constants.SETTINGS_FILENAME)
+    try:
+        return read_cached(fpath, read_config)
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"{constants.SETTINGS_FILENAME} doesn't exist"
+        ) from None
 
 
 def get_project_list() -> list:
@@ -0,0 +1,151 @@
+import builtins
+import io
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+from functools import partial
+from typing import Callable
+
+from data_manager.utils import COMPRESSION_EXTENSIONS, open_json_file
+
+
+class BackgroundWriter:
+    # runs the writes on a thread, in order. submit blocks when max_pending
+    # writes are already waiting, so that a fast loop can't eat all the memory.
+    # errors are raised on the next submit or flush, after that submit's
+    # write was queued
+    def __init__(self, max_pending: int = 8, name: str = "data_manager_writer"):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.name = name
+        self.errors = []
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name=self.name, daemon=True
+                )
+                self.thread.start()
+
+    def run(self):
+        while True:
+            func, args, kwargs = self.queue.get()
+            try:
+                func(*args, **kwargs)
+            except BaseException as e:
+                self.errors.append(e)
+            finally:
+                self.queue.task_done()
+
+    def submit(self, func: Callable, *args, **kwargs):
+        # the file name is already taken, so the write goes in the queue
+        # even if an earlier one failed
+        self.start()
+        self.queue.put((func, args, kwargs))
+        self.raise_errors()
+
+    def flush(self):
+        # waits for everything submitted so far
+        self.queue.join()
+        self.raise_errors()
+
+    @property
+    def n_pending(self) -> int:
+        return self.queue.unfinished_tasks
+
+    def raise_errors(self):
+        if not self.errors:
+            return
+        errors = self.errors.copy()
+        self.errors.clear()
+        if len(errors) == 1:
+            raise errors[0]
+        raise RuntimeError(
+            f"{len(errors)} background writes failed, first one: {errors[0]!r}"
+        ) from errors[0]
+
+
+# what is printed goes through a bounded queue to a thread that writes it to
+# stdout and to the log file, so print only has to build the string
+PRINT_QUEUE_SIZE = 2**14
+
+
+class PrintListener(logging.handlers.QueueListener):
+    # the queue has the printed strings, the records are made on the thread
+    def prepare(self, message: str) -> logging.LogRecord:
+        return logging.makeLogRecord(
+            {"msg": message, "levelno": logging.INFO, "levelname": "INFO"}
+        )
+
+    def enqueue_sentinel(self):
+        # waits for room, the queue might be full when stopping
+        self.queue.put(self._sentinel)
+
+
+def compress_rotated_log(compression: str, source: str, dest: str):
+    with io.open(source, "r", encoding="utf8") as fin:
+        with open_json_file(dest, "w", compression=compression) as fout:
+            shutil.copyfileobj(fin, fout)
+    os.remove(source)
+
+
+class PrintRedirect:
+    # print(..., sep=, end=, file=, flush=) that tees to stdout and fpath.
+    # with max_bytes, the log is rotated into backup_count older files,
+    # compressed if compression is given
+    def __init__(
+        self,
+        fpath: os.PathLike,
+        max_bytes: int = None,
+        backup_count: int = 10,
+        compression: str = None,
+        queue_size: int = PRINT_QUEUE_SIZE,
+    ):
+        self.fpath = fpath
+        self.stream = sys.stdout
+        self.queue = queue.Queue(maxsize=queue_size)
+        if max_bytes is not None:
+            file_handler = logging.handlers.RotatingFileHandler(
+                fpath, maxBytes=max_bytes, backupCount=backup_count, encoding="utf8"
+            )
+            if compression is not None:
+                extension = COMPRESSION_EXTENSIONS[compression]
+                file_handler.namer = lambda name: name + extension
+                file_handler.rotator = partial(compress_rotated_log, compression)
+        else:
+            file_handler = logging.FileHandler(fpath, encoding="utf8")
+        self.handlers = [logging.StreamHandler(self.stream), file_handler]
+        for handler in self.handlers:
+            # the newline is already in the message
+            handler.terminator = ""
+        self.listener = PrintListener(self.queue, *self.handlers)
+        self.listener.start()
+
+    def print(self, *args, sep: str = " ", end: str = "\n", file=None, flush=False):
+        if file is not None and file is not self.stream:
+            return builtins.print(*args, sep=sep, end=end, file=file, flush=flush)
+        if sep is None:
+            sep = " "
+        if end is None:
+            end = "\n"
+        # blocks if the thread is too far behind
+        self.queue.put(sep.join(map(str, args)) + end)
+        if flush:
+            self.flush()
+
+    def flush(self):
+        self.queue.join()
+        for handler in self.handlers:
+            handler.flush()
+
+    def stop(self):
+        # writes what is left
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()